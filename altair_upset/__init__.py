@@ -1,6 +1,22 @@
 """UpSet plots using Altair."""
 
-from .upset import UpSetAltair
+from .upset import UpSetAltair, UpSetAltair_async
 from .config import upsetaltair_top_level_configuration
+from .sources import FileSource, SQLSource
+from .budget import estimate_budget, measure_budget
+from .report import save_report
+from .store import IntersectionStore, PartialCounts, save_intersections
 
-__all__ = ["UpSetAltair", "upsetaltair_top_level_configuration"]
+__all__ = [
+    "UpSetAltair",
+    "UpSetAltair_async",
+    "upsetaltair_top_level_configuration",
+    "SQLSource",
+    "FileSource",
+    "estimate_budget",
+    "measure_budget",
+    "save_intersections",
+    "IntersectionStore",
+    "PartialCounts",
+    "save_report",
+]
@@ -0,0 +1,56 @@
+"""Running chart building and rendering off the asyncio event loop.
+
+Preprocessing and vl-convert rendering are CPU bound and take seconds on large
+inputs. The async API runs them in a shared, bounded thread pool so that at
+most ``max_workers`` of them run at once, whatever the number of concurrent
+requests; the rest wait in the pool's queue without blocking the loop.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Default number of charts built or rendered at the same time
+MAX_WORKERS = 4
+
+_executor = None
+_lock = threading.Lock()
+
+
+def set_max_workers(max_workers):
+    """Sets how many charts may be built or rendered at the same time.
+
+    Work already submitted finishes on the previous pool.
+    """
+    global _executor
+    if max_workers < 1:
+        raise ValueError("max_workers must be a positive integer")
+    with _lock:
+        previous, _executor = _executor, _make_executor(max_workers)
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+def _make_executor(max_workers):
+    return ThreadPoolExecutor(max_workers, thread_name_prefix="altair-upset")
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = _make_executor(MAX_WORKERS)
+        return _executor
+
+
+async def run_in_executor(func, *args, **kwargs):
+    """Awaits ``func(*args, **kwargs)`` run in the bounded pool.
+
+    Cancelling the awaiting task removes the call from the queue if it has not
+    started yet. A call that is already running completes in the background
+    and its result is discarded.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(), call)
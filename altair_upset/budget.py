@@ -0,0 +1,158 @@
+"""Spec size, mark count and render time of UpSet charts.
+
+``estimate_budget`` predicts them from the sets and the number of intersections
+before any chart is built; ``measure_budget`` reports the actual numbers of an
+existing chart. Both return a dict with the keys ``spec_bytes``, ``rows``,
+``marks`` and ``render_seconds``, so services can compare the two or refuse,
+page or switch to ``lean_matrix`` when a chart would be too large.
+"""
+
+import json
+import math
+import time
+
+# Serialized size of everything but the data: encodings, params and config
+SPEC_OVERHEAD_BYTES = {False: 8_000, True: 6_500}
+
+# Axes, axis titles and other guide marks besides the legend
+GUIDE_MARKS = 21
+
+# Headless render time (vl-convert) of a chart: startup plus a cost per mark
+RENDER_SECONDS_BASE = 0.15
+RENDER_SECONDS_PER_MARK = 9e-5
+
+# Typical value sizes used for the fields whose values are not known upfront
+TYPICAL_COUNT = 1_000
+TYPICAL_AGGREGATE = 1234.5678901234
+
+
+def _row_bytes(sets, abbre, n_intersections, aggregates, group_by):
+    """Serialized size of an average row of the long table."""
+    name_bytes = sum(len(json.dumps(s)) for s in sets) / len(sets)
+    abbre_bytes = sum(len(json.dumps(a)) for a in abbre) / len(abbre)
+    row = {
+        "intersection_id": n_intersections,
+        "count": TYPICAL_COUNT,
+        "degree": len(sets),
+        "rank": n_intersections,
+        "set": "",
+        "is_intersect": 0,
+        "set_size": TYPICAL_COUNT,
+        "set_abbre": "",
+        "set_order": len(sets),
+    }
+    for column, op in (aggregates or {}).items():
+        row[f"{column}_{op}"] = TYPICAL_AGGREGATE
+    if group_by is not None:
+        row[group_by] = ""
+    # The two empty strings stand in for the names; 2 more for the ", " separator
+    return len(json.dumps(row)) - 4 + name_bytes + abbre_bytes + 2
+
+
+def estimate_budget(
+    sets,
+    n_intersections,
+    *,
+    abbre=None,
+    aggregates=None,
+    group_by=None,
+    n_groups=1,
+    lean_matrix=False,
+    page_size=None,
+    max_bar_labels=100,
+):
+    """Estimates the size of the chart ``UpSetAltair`` would build.
+
+    Parameters
+    ----------
+    sets : list of str
+        The sets to plot.
+    n_intersections : int
+        Number of non-empty intersections, e.g. from ``count_intersections``
+        or a ``SELECT COUNT(*)`` over the distinct set columns.
+    abbre, aggregates, group_by, lean_matrix, page_size, max_bar_labels
+        As for ``UpSetAltair``.
+    n_groups : int, default 1
+        Number of values of ``group_by``. Each group is assumed to contain
+        every intersection, so the estimate is an upper bound.
+
+    Returns
+    -------
+    dict
+        ``spec_bytes``, ``rows``, ``marks`` and ``render_seconds``.
+    """
+    abbre = sets if abbre is None else abbre
+    n_sets = len(sets)
+    rows = n_intersections * n_sets * n_groups
+    spec_bytes = SPEC_OVERHEAD_BYTES[bool(lean_matrix)] + rows * _row_bytes(
+        sets, abbre, n_intersections, aggregates, group_by
+    )
+
+    # Marks of one panel; members assumes half of all cells are filled
+    visible = min(n_intersections, page_size or n_intersections)
+    cells = visible * n_sets
+    members = cells / 2
+    labels = visible / math.ceil(visible / max_bar_labels) if visible else 0
+    stripes = math.ceil(n_sets / 2)
+    if lean_matrix:
+        matrix = cells + visible + stripes
+    else:
+        matrix = 2 * members + cells + visible * stripes + visible
+    # Set labels are drawn once per set, over a circle when the abbreviations
+    # are short
+    label_layers = 2 if len(abbre[0]) <= 2 else 1
+    set_panel = label_layers * n_sets + n_sets
+    panel = visible + labels + matrix + set_panel
+    marks = int(n_groups * panel + 2 * n_sets + GUIDE_MARKS)
+
+    return {
+        "spec_bytes": int(spec_bytes),
+        "rows": rows,
+        "marks": marks,
+        "render_seconds": RENDER_SECONDS_BASE + RENDER_SECONDS_PER_MARK * marks,
+    }
+
+
+def _count_marks(scene):
+    """Counts the non-group items of a Vega scenegraph."""
+    if isinstance(scene, list):
+        return sum(_count_marks(item) for item in scene)
+    if not isinstance(scene, dict):
+        return 0
+    count = 0
+    if scene.get("marktype") not in (None, "group"):
+        count += len(scene.get("items", []))
+    return count + sum(_count_marks(value) for value in scene.values())
+
+
+def _dataset_rows(values):
+    # CSV datasets are one string with a header line and a trailing newline
+    if isinstance(values, str):
+        return values.count("\n") - 1
+    return len(values)
+
+
+def measure_budget(chart, render=True):
+    """Reports the actual size of ``chart``.
+
+    ``chart`` is an ``UpSetChart`` or any Altair chart. With ``render`` the
+    chart is rendered headlessly with vl-convert to count its marks and time
+    the render; otherwise ``marks`` and ``render_seconds`` are None.
+    """
+    spec = chart.to_dict()
+    budget = {
+        "spec_bytes": len(json.dumps(spec)),
+        "rows": sum(
+            _dataset_rows(values) for values in spec.get("datasets", {}).values()
+        ),
+        "marks": None,
+        "render_seconds": None,
+    }
+    if render:
+        import vl_convert as vlc
+
+        start = time.perf_counter()
+        scene = vlc.vegalite_to_scenegraph(spec)
+        budget["render_seconds"] = time.perf_counter() - start
+        budget["marks"] = _count_marks(scene)
+    return budget
@@ -0,0 +1,187 @@
+"""The ``altair-upset`` command line tool.
+
+Each input file is streamed in record batches with only the set, group and
+aggregate columns read, so files much larger than memory can be plotted.
+Several inputs are processed in parallel worker processes::
+
+    altair-upset data.parquet --sets a,b,c -o upset.html
+    altair-upset runs/*.csv --sets a,b,c --format svg --output-dir plots --jobs 4
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import altair as alt
+
+from .preprocessing import MODES
+from .sources import BATCH_SIZE, FileSource
+from .upset import UpSetAltair
+
+FORMATS = ("html", "json", "png", "svg")
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value}")
+    return number
+
+
+def _comma_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def build_parser():
+    """Returns the argument parser of ``altair-upset``."""
+    parser = argparse.ArgumentParser(
+        prog="altair-upset",
+        description="Create UpSet plots from CSV, Parquet or Arrow files.",
+    )
+    parser.add_argument("inputs", nargs="+", help="CSV, Parquet or Arrow files")
+    parser.add_argument(
+        "--sets",
+        type=_comma_list,
+        required=True,
+        help="comma-separated set columns to plot",
+    )
+    parser.add_argument("--abbre", type=_comma_list, help="set abbreviations")
+    parser.add_argument("--title", default="", help="chart title")
+    parser.add_argument("--group-by", help="column to draw one panel per value of")
+    parser.add_argument("--mode", choices=MODES, default="exclusive")
+    parser.add_argument(
+        "--sort-by", choices=("frequency", "degree"), default="frequency"
+    )
+    parser.add_argument(
+        "--sort-order", choices=("ascending", "descending"), default="ascending"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="output file; only valid with a single input",
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="directory for the outputs, named after the inputs "
+        "(default: next to each input)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="output format (default: from the --output suffix, else html)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=_positive_int,
+        default=BATCH_SIZE,
+        help=f"rows read per batch (default: {BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=_positive_int,
+        default=1,
+        help="number of input files processed in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--max-intersections",
+        type=_positive_int,
+        help="plot only this many of the largest intersections",
+    )
+    parser.add_argument("--page-size", type=_positive_int)
+    parser.add_argument("--lean-matrix", action="store_true")
+    parser.add_argument("--width", type=_positive_int, default=1200)
+    parser.add_argument("--height", type=_positive_int, default=700)
+    return parser
+
+
+def _output_path(source, args, file_format):
+    """Where the chart of ``source`` is written."""
+    if args.output:
+        return args.output
+    stem = os.path.basename(os.path.normpath(source))
+    for suffix in (".gz", ".bz2"):
+        stem = stem.removesuffix(suffix)
+    stem = os.path.splitext(stem)[0]
+    directory = args.output_dir or os.path.dirname(os.path.normpath(source))
+    return os.path.join(directory, f"{stem}.{file_format}")
+
+
+def render_file(source, output, file_format, options):
+    """Plots one input file and writes the chart to ``output``.
+
+    This is the unit of work of a worker process, so it takes and returns
+    only picklable values.
+    """
+    batch_size = options.pop("chunk_size")
+    chart = UpSetAltair(FileSource(source, batch_size), **options)
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with alt.data_transformers.disable_max_rows():
+        chart.save(output, format=file_format)
+    return output
+
+
+def main(argv=None):
+    """Runs ``altair-upset``; returns the exit status."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.output and len(args.inputs) > 1:
+        parser.error("--output takes a single input; use --output-dir instead")
+
+    file_format = args.format
+    if file_format is None and args.output:
+        suffix = os.path.splitext(args.output)[1].lstrip(".").lower()
+        file_format = suffix if suffix in FORMATS else None
+    file_format = file_format or "html"
+
+    options = {
+        "sets": args.sets,
+        "abbre": args.abbre,
+        "title": args.title,
+        "group_by": args.group_by,
+        "mode": args.mode,
+        "sort_by": args.sort_by,
+        "sort_order": args.sort_order,
+        "max_intersections": args.max_intersections,
+        "page_size": args.page_size,
+        "lean_matrix": args.lean_matrix,
+        "width": args.width,
+        "height": args.height,
+        "chunk_size": args.chunk_size,
+    }
+    jobs = [
+        (source, _output_path(source, args, file_format), file_format, dict(options))
+        for source in args.inputs
+    ]
+
+    status = 0
+    if args.jobs == 1 or len(jobs) == 1:
+        results = []
+        for job in jobs:
+            try:
+                results.append((job[0], render_file(*job), None))
+            except Exception as error:
+                results.append((job[0], None, error))
+    else:
+        with ProcessPoolExecutor(min(args.jobs, len(jobs))) as executor:
+            futures = [(job[0], executor.submit(render_file, *job)) for job in jobs]
+            results = []
+            for source, future in futures:
+                try:
+                    results.append((source, future.result(), None))
+                except Exception as error:
+                    results.append((source, None, error))
+
+    for source, output, error in results:
+        if error is None:
+            print(output)
+        else:
+            print(f"altair-upset: {source}: {error}", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
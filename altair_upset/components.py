@@ -8,49 +8,83 @@ def create_vertical_bar(
     main_color,
     vertical_bar_size,
     brush_color,
-    x_sort,
     tooltip,
     vertical_bar_label_size,
+    x_scale=alt.Undefined,
+    y_scale=alt.Undefined,
+    label_step=1,
+    opacity=alt.Undefined,
 ):
-    """Creates the vertical bar chart component."""
+    """Creates the vertical bar chart component.
+
+    ``base`` must hold one row per intersection (see
+    ``create_intersection_chart``); the bars encode the precomputed counts
+    directly. ``x_scale`` and ``y_scale`` pin the scales, e.g. to align grouped
+    panels. With ``label_step`` above 1 only every ``label_step``-th bar is
+    labelled. ``opacity`` is an optional encoding of the bars, e.g. to fade
+    unreliable estimates.
+    """
     vertical_bar = base.mark_bar(color=main_color, size=vertical_bar_size).encode(
         x=alt.X(
-            "intersection_id:N",
+            "rank:O",
             axis=alt.Axis(grid=False, labels=False, ticks=False, domain=True),
-            sort=x_sort,
+            scale=x_scale,
             title=None,
         ),
         y=alt.Y(
-            "max(count):Q",
+            "count:Q",
             axis=alt.Axis(grid=False, tickCount=3, orient="right"),
+            scale=y_scale,
             title="Intersection Size",
         ),
         color=brush_color,
+        opacity=opacity,
         tooltip=tooltip,
     )
 
     vertical_bar_text = vertical_bar.mark_text(
         color=main_color, dy=-10, size=vertical_bar_label_size
     ).encode(text=alt.Text("count:Q", format=".0f"))
+    if label_step > 1:
+        vertical_bar_text = vertical_bar_text.transform_filter(
+            alt.datum["rank"] % label_step == 0
+        )
 
     return vertical_bar, vertical_bar_text
 
 
+def create_error_bars(base, main_color, x_scale=alt.Undefined, y_scale=alt.Undefined):
+    """Creates error bars spanning ``count_lower`` to ``count_upper``.
+
+    ``base`` and the scales are the same as for ``create_vertical_bar``.
+    """
+    return base.mark_rule(color=main_color, strokeWidth=1.5).encode(
+        x=alt.X("rank:O", scale=x_scale, title=None),
+        y=alt.Y("count_lower:Q", scale=y_scale, title="Intersection Size"),
+        y2="count_upper:Q",
+    )
+
+
 def create_matrix_view(
-    vertical_bar,
+    base,
     matrix_height,
     glyph_size,
-    x_sort,
     brush_color,
     line_connection_size,
     main_color,
+    tooltip,
+    x_scale=alt.Undefined,
 ):
-    """Creates the matrix view component."""
-    circle_bg = vertical_bar.mark_circle(size=glyph_size, opacity=1).encode(
+    """Creates the matrix view component.
+
+    Hovering only changes the glyph colors through ``brush_color``; no layer
+    filters or aggregates on the hover selection.
+    """
+    circle_bg = base.mark_circle(size=glyph_size, opacity=1).encode(
         x=alt.X(
-            "intersection_id:N",
+            "rank:O",
             axis=alt.Axis(grid=False, labels=False, ticks=False, domain=False),
-            sort=x_sort,
+            scale=x_scale,
             title=None,
         ),
         y=alt.Y(
@@ -59,6 +93,7 @@ def create_matrix_view(
             title=None,
         ),
         color=alt.value("#E6E6E6"),
+        tooltip=tooltip,
     )
 
     rect_bg = (
@@ -72,14 +107,78 @@ def create_matrix_view(
     )
 
     line_connection = (
-        vertical_bar.mark_bar(size=line_connection_size, color=main_color)
+        circle_bg.mark_bar(size=line_connection_size, color=main_color)
         .transform_filter(alt.datum["is_intersect"] == 1)
-        .encode(y=alt.Y("min(set_order):N"), y2=alt.Y2("max(set_order):N"))
+        .encode(
+            y=alt.Y("min(set_order):N"),
+            y2=alt.Y2("max(set_order):N"),
+            # Keep the id in the aggregated datum so the hover test can match it
+            detail="intersection_id:N",
+            color=brush_color,
+        )
     )
 
     return circle_bg, rect_bg, circle, line_connection
 
 
+def create_lean_matrix_view(
+    base,
+    n_sets,
+    glyph_size,
+    brush_color,
+    line_connection_size,
+    main_color,
+    tooltip,
+    x_scale=alt.Undefined,
+):
+    """Creates the matrix view with the fewest marks.
+
+    Each cell is drawn once, colored by membership and hover in a single
+    circle layer, and the stripes are one full-width rect per odd set row
+    generated in Vega rather than one rect per cell.
+    """
+    y = alt.Y(
+        "set_order:N",
+        axis=alt.Axis(grid=False, labels=False, ticks=False, domain=False),
+        title=None,
+    )
+    stripes = (
+        alt.Chart(alt.sequence(1, n_sets + 1, 2, as_="set_order"))
+        .mark_rect(color="#F7F7F7")
+        .encode(y=y)
+    )
+
+    empty_cell = {"test": alt.datum["is_intersect"] == 0, "value": "#E6E6E6"}
+    cells = base.mark_circle(size=glyph_size, opacity=1).encode(
+        x=alt.X(
+            "rank:O",
+            axis=alt.Axis(grid=False, labels=False, ticks=False, domain=False),
+            scale=x_scale,
+            title=None,
+        ),
+        y=y,
+        color={
+            "condition": [empty_cell, brush_color["condition"]],
+            "value": brush_color["value"],
+        },
+        tooltip=tooltip,
+    )
+
+    line_connection = (
+        cells.mark_bar(size=line_connection_size, color=main_color)
+        .transform_filter(alt.datum["is_intersect"] == 1)
+        .encode(
+            y=alt.Y("min(set_order):N"),
+            y2=alt.Y2("max(set_order):N"),
+            # Keep the id in the aggregated datum so the hover test can match it
+            detail="intersection_id:N",
+            color=brush_color,
+        )
+    )
+
+    return stripes, cells, line_connection
+
+
 def create_horizontal_bar(
     base,
     set_label_bg_size,
@@ -89,9 +188,17 @@ def create_horizontal_bar(
     horizontal_bar_label_bg_color,
     horizontal_bar_size,
     horizontal_bar_chart_width,
+    x_scale=alt.Undefined,
 ):
-    """Creates the horizontal bar chart component."""
-    horizontal_bar_label_bg = base.mark_circle(size=set_label_bg_size).encode(
+    """Creates the horizontal bar chart component.
+
+    Its layers read one row per set, so the labels are drawn once per set
+    rather than once per intersection, whatever the page shows.
+    """
+    per_set = base.transform_aggregate(
+        set_size="max(set_size)", groupby=["set", "set_order", "set_abbre"]
+    )
+    horizontal_bar_label_bg = per_set.mark_circle(size=set_label_bg_size).encode(
         y=alt.Y(
             "set_order:N",
             axis=alt.Axis(grid=False, labels=False, ticks=False, domain=False),
@@ -109,13 +216,12 @@ def create_horizontal_bar(
         text=alt.Text("set_abbre:N"), color=alt.value(horizontal_bar_label_bg_color)
     )
 
-    horizontal_bar = (
-        horizontal_bar_label_bg.mark_bar(size=horizontal_bar_size)
-        .transform_filter(alt.datum["is_intersect"] == 1)
-        .encode(
-            x=alt.X(
-                "sum(count):Q", axis=alt.Axis(grid=False, tickCount=3), title="Set Size"
-            )
+    horizontal_bar = horizontal_bar_label_bg.mark_bar(size=horizontal_bar_size).encode(
+        x=alt.X(
+            "set_size:Q",
+            axis=alt.Axis(grid=False, tickCount=3),
+            scale=x_scale,
+            title="Set Size",
         )
     )
 
@@ -1,4 +1,8 @@
+from importlib.metadata import entry_points
+
 import altair as alt
+from altair.utils import update_nested
+from altair.vegalite.v5.theme import themes
 
 
 def upsetaltair_top_level_configuration(
@@ -28,3 +32,59 @@ def upsetaltair_top_level_configuration(
         )
         .configure_concat(spacing=0)
     )
+
+
+def _registered_theme(name):
+    """The function of the registered Altair theme ``name``, not enabled.
+
+    Altair only hands out the active theme, so the registry's themes and the
+    themes of its entry point group are looked up by name instead; the
+    process-wide theme is never touched.
+    """
+    if name in themes._plugins:
+        return themes._plugins[name]
+    points = entry_points()
+    if hasattr(points, "select"):
+        points = points.select(group=themes.entry_point_group)
+    else:  # Python 3.9
+        points = points.get(themes.entry_point_group, [])
+    for point in points:
+        if point.name == name:
+            return point.load()
+    raise ValueError(
+        f"unknown theme '{name}'; registered themes: {', '.join(themes.names())}"
+    )
+
+
+def theme_properties(theme):
+    """Top-level spec properties of a theme, e.g. its ``config``.
+
+    ``theme`` is the name of a registered Altair theme, a function returning
+    the properties, or the properties themselves. Registered themes are called
+    without being enabled, so the process-wide theme is left untouched.
+    """
+    if isinstance(theme, dict):
+        return theme
+    if callable(theme):
+        return theme()
+    return _registered_theme(theme)()
+
+
+def apply_theme(chart, theme):
+    """Merges ``theme`` into the chart's own top-level properties.
+
+    As with an enabled theme, values set on the chart take precedence over
+    the theme's. Properties the chart type does not have are skipped.
+    """
+    for key, value in theme_properties(theme).items():
+        try:
+            current = chart[key]
+        except KeyError:
+            continue
+        if current is alt.Undefined:
+            chart = chart.properties(**{key: value})
+        elif isinstance(value, dict):
+            current = current.to_dict() if hasattr(current, "to_dict") else current
+            merged = update_nested(dict(value), current, copy=True)
+            chart = chart.properties(**{key: merged})
+    return chart
@@ -0,0 +1,357 @@
+"""Backends that count the intersections of a pandas DataFrame.
+
+Every engine returns exactly the table of the pandas reference
+(``count_intersections``): one row per observed combination of set memberships
+(and group), sorted by group and then membership, with the set columns in
+their input dtypes, an int64 ``count`` and one column per aggregate field.
+They only differ in how they get there:
+
+- ``"pandas"``: a groupby over the set columns; supports every aggregation.
+- ``"numpy"``: packs each row's memberships into a uint64 code and counts the
+  codes with ``bincount`` (few sets) or a sort; aggregates are reduced over the
+  sorted rows.
+- ``"polars"``: groups the codes with Polars' multithreaded hash group-by.
+- ``"numba"``: a compiled loop that packs and counts in one pass, without
+  materializing the codes.
+
+``engine="auto"`` picks one with ``select_engine``. Other backends can be added
+with ``register_engine``.
+"""
+
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+from .preprocessing import (
+    DENSE_TRANSFORM_MAX_SETS,
+    aggregate_fields,
+    count_intersections,
+    membership_codes,
+)
+
+# Below this many rows there is nothing to gain from another engine
+MIN_ROWS = 1_000
+
+# Polars is faster than NumPy for aggregates from about this many rows, once
+# converting the columns from pandas is paid for
+POLARS_MIN_ROWS = 1_000_000
+
+# Rows from which the compiled Numba loop pays for its compilation
+NUMBA_MIN_ROWS = 1_000_000
+
+# Aggregations each engine computes the way pandas does; None means all
+NUMPY_OPS = ("sum", "count", "min", "max", "mean")
+POLARS_OPS = ("sum", "count", "min", "max", "mean", "median", "std", "var")
+
+
+class Engine:
+    """An aggregation backend.
+
+    Parameters
+    ----------
+    name : str
+        The name passed as ``engine``.
+    count : callable
+        ``count(data, sets, aggregates, group_by)`` returning the table of
+        ``count_intersections``.
+    requires : str, optional
+        A module the engine needs; it is unavailable if it is not installed.
+    ops : tuple of str, optional
+        The aggregations it supports, on numeric columns. None means any
+        aggregation on any column.
+    max_sets : int, default 64
+        The most sets it can count.
+    grouped : bool, default True
+        Whether it supports ``group_by``.
+    """
+
+    def __init__(self, name, count, requires=None, ops=None, max_sets=64, grouped=True):
+        self.name = name
+        self.count = count
+        self.requires = requires
+        self.ops = ops
+        self.max_sets = max_sets
+        self.grouped = grouped
+
+    def available(self):
+        """Whether the module the engine needs is installed."""
+        if self.requires is None:
+            return True
+        return importlib.util.find_spec(self.requires) is not None
+
+    def supports(self, data, sets, aggregates=None, group_by=None):
+        """Whether the engine can count ``data`` with these options."""
+        if len(sets) > self.max_sets or (group_by is not None and not self.grouped):
+            return False
+        if self.ops is None or not aggregates:
+            return True
+        return all(
+            op in self.ops and data[column].dtype.kind in "if"
+            for column, op in aggregates.items()
+        )
+
+    def __repr__(self):
+        return f"Engine({self.name!r})"
+
+
+ENGINES = {}
+
+
+def register_engine(name, count, requires=None, ops=None, max_sets=64, grouped=True):
+    """Adds an aggregation backend that ``engine=name`` selects.
+
+    The arguments are those of ``Engine``. ``count`` must return exactly the
+    table the ``"pandas"`` engine returns.
+    """
+    ENGINES[name] = Engine(name, count, requires, ops, max_sets, grouped)
+    return ENGINES[name]
+
+
+def available_engines():
+    """The names of the registered engines whose requirements are installed."""
+    return [name for name, engine in ENGINES.items() if engine.available()]
+
+
+def select_engine(data, sets, aggregates=None, group_by=None):
+    """Picks the engine ``engine="auto"`` uses for counting ``data``.
+
+    NumPy counts membership codes several times faster than the pandas
+    groupby for any number of sets, so it is used unless the aggregates need
+    pandas. Numba and Polars take over for large inputs they support.
+    """
+    n_rows = len(data)
+    if n_rows < MIN_ROWS:
+        return "pandas"
+    candidates = ["numpy"]
+    if n_rows >= NUMBA_MIN_ROWS:
+        candidates.insert(0, "numba")
+    if aggregates and n_rows >= POLARS_MIN_ROWS:
+        candidates.insert(0, "polars")
+    for name in candidates:
+        engine = ENGINES.get(name)
+        if (
+            engine is not None
+            and engine.available()
+            and engine.supports(data, sets, aggregates, group_by)
+        ):
+            return name
+    return "pandas"
+
+
+def get_engine(name, data, sets, aggregates=None, group_by=None):
+    """The engine called ``name`` (or chosen for ``"auto"``) for these options.
+
+    Raises ValueError for unknown engines or options the engine does not
+    support, and ImportError if its requirements are not installed.
+    """
+    if name == "auto":
+        name = select_engine(data, sets, aggregates, group_by)
+    if name not in ENGINES:
+        raise ValueError(
+            f"engine must be 'auto' or one of {', '.join(ENGINES)}, not '{name}'"
+        )
+    engine = ENGINES[name]
+    if not engine.available():
+        raise ImportError(f"engine '{name}' requires {engine.requires}")
+    if not engine.supports(data, sets, aggregates, group_by):
+        raise ValueError(f"engine '{name}' does not support these options")
+    return engine
+
+
+def _group_ids(data, group_by):
+    """Sorted group ids of each row (-1 for missing) and the group values."""
+    if group_by is None:
+        return np.zeros(len(data), dtype=np.int64), None
+    return pd.factorize(data[group_by], sort=True)
+
+
+def _counted_table(data, sets, group_by, uniques, group_ids, codes, counts):
+    """Assembles the reference table from unique (group, code) pairs."""
+    table = {}
+    if group_by is not None:
+        table[group_by] = uniques.take(group_ids)
+    n_sets = len(sets)
+    for i, s in enumerate(sets):
+        bit = np.uint64(n_sets - 1 - i)
+        table[s] = ((codes >> bit) & np.uint64(1)).astype(data[s].dtype)
+    table["count"] = np.asarray(counts, dtype=np.int64)
+    return pd.DataFrame(table)
+
+
+def _histogram_table(data, sets, histogram):
+    """Assembles the reference table from the counts of every code."""
+    observed = np.flatnonzero(histogram)
+    codes = observed.astype(np.uint64)
+    return _counted_table(data, sets, None, None, None, codes, histogram[observed])
+
+
+def _pandas_dtype(result, dtype, op):
+    """Casts the ``op`` reduction of a column of ``dtype`` as pandas does.
+
+    pandas reduces integers in int64 and casts sums back to the column's dtype
+    only when every sum fits; float32 columns stay float32.
+    """
+    result = np.asarray(result)
+    if op == "count":
+        return result.astype(np.int64)
+    if dtype.kind != "i" or op in ("min", "max"):
+        return result.astype(dtype)
+    if op == "sum":
+        narrowed = result.astype(dtype)
+        return narrowed if (narrowed == result).all() else result.astype(np.int64)
+    return result.astype(np.float64)
+
+
+def _reduce(values, starts, lengths, op):
+    """Applies ``op`` to the runs of sorted ``values`` beginning at ``starts``.
+
+    Missing values are skipped, as pandas does. Sums are accumulated in 64
+    bits and the result has the dtype pandas returns.
+    """
+    missing = np.isnan(values) if values.dtype.kind == "f" else None
+    if op in ("sum", "count", "mean"):
+        if missing is None:
+            present = lengths
+        else:
+            present = np.add.reduceat((~missing).astype(np.int64), starts)
+        if op == "count":
+            return _pandas_dtype(present, values.dtype, op)
+        total = np.add.reduceat(
+            values if missing is None else np.where(missing, 0, values),
+            starts,
+            dtype=np.int64 if values.dtype.kind == "i" else np.float64,
+        )
+        if op == "sum":
+            return _pandas_dtype(total, values.dtype, op)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return _pandas_dtype(total / present, values.dtype, op)
+    ufunc = np.fmin if op == "min" else np.fmax
+    return ufunc.reduceat(values, starts)
+
+
+def numpy_count(data, sets, aggregates=None, group_by=None):
+    """Counts membership codes with NumPy; see the module docstring."""
+    codes = membership_codes(data, sets)
+    group_ids, uniques = _group_ids(data, group_by)
+    keep = group_ids >= 0
+    fields = aggregate_fields(aggregates)
+    n_sets = len(sets)
+
+    if group_by is None and not fields and (1 << n_sets) <= 4 * max(len(codes), 1):
+        # Few sets: a dense histogram of the codes needs no sort
+        histogram = np.bincount(codes.astype(np.int64), minlength=1 << n_sets)
+        return _histogram_table(data, sets, histogram)
+
+    order = np.lexsort((codes, group_ids))
+    order = order[keep[order]]
+    sorted_codes, sorted_groups = codes[order], group_ids[order]
+    boundaries = np.ones(len(order), dtype=bool)
+    boundaries[1:] = (sorted_codes[1:] != sorted_codes[:-1]) | (
+        sorted_groups[1:] != sorted_groups[:-1]
+    )
+    starts = np.flatnonzero(boundaries)
+    lengths = np.diff(np.append(starts, len(order)))
+    table = _counted_table(
+        data,
+        sets,
+        group_by,
+        uniques,
+        sorted_groups[starts],
+        sorted_codes[starts],
+        lengths,
+    )
+    for field, (column, op) in fields.items():
+        values = data[column].to_numpy()[order]
+        table[field] = _reduce(values, starts, lengths, op) if len(starts) else []
+    return table
+
+
+def _widened(values):
+    """Integer values as int64 and floats as float64."""
+    return values.astype(np.int64 if values.dtype.kind == "i" else np.float64)
+
+
+def polars_count(data, sets, aggregates=None, group_by=None):
+    """Groups membership codes with Polars; see the module docstring."""
+    import polars as pl
+
+    fields = aggregate_fields(aggregates)
+    group_ids, uniques = _group_ids(data, group_by)
+    frame = pl.DataFrame(
+        {
+            "__group": group_ids,
+            "__code": membership_codes(data, sets),
+            # Widened so that Polars doesn't overflow narrow sums
+            **{
+                column: _widened(data[column].to_numpy())
+                for column in dict(aggregates or {})
+            },
+        },
+        nan_to_null=True,
+    )
+    expressions = [pl.len().alias("count")]
+    for field, (column, op) in fields.items():
+        expression = getattr(pl.col(column), op)()
+        expressions.append(expression.alias(field))
+    counted = (
+        frame.filter(pl.col("__group") >= 0)
+        .group_by(["__group", "__code"])
+        .agg(expressions)
+        .sort(["__group", "__code"])
+    )
+    table = _counted_table(
+        data,
+        sets,
+        group_by,
+        uniques,
+        counted["__group"].to_numpy(),
+        counted["__code"].to_numpy().astype(np.uint64),
+        counted["count"].to_numpy(),
+    )
+    for field, (column, op) in fields.items():
+        values = counted[field].to_numpy()
+        table[field] = _pandas_dtype(values, data[column].dtype, op)
+    return table
+
+
+_numba_kernel = None
+
+
+def _dense_count_kernel():
+    """Compiles, once, the loop that packs and counts the memberships."""
+    global _numba_kernel
+    if _numba_kernel is None:
+        import numba
+
+        @numba.njit(nogil=True, cache=True)
+        def kernel(values, histogram):
+            n_rows, n_sets = values.shape
+            for i in range(n_rows):
+                code = 0
+                for j in range(n_sets):
+                    code = (code << 1) | int(values[i, j])
+                histogram[code] += 1
+
+        _numba_kernel = kernel
+    return _numba_kernel
+
+
+def numba_count(data, sets, aggregates=None, group_by=None):
+    """Packs and counts memberships in one compiled pass; see the module docstring."""
+    histogram = np.zeros(1 << len(sets), dtype=np.int64)
+    _dense_count_kernel()(data[sets].to_numpy(dtype=np.uint8), histogram)
+    return _histogram_table(data, sets, histogram)
+
+
+register_engine("pandas", count_intersections)
+register_engine("numpy", numpy_count, ops=NUMPY_OPS)
+register_engine("polars", polars_count, requires="polars", ops=POLARS_OPS)
+register_engine(
+    "numba",
+    numba_count,
+    requires="numba",
+    ops=(),
+    max_sets=DENSE_TRANSFORM_MAX_SETS,
+    grouped=False,
+)
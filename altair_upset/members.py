@@ -0,0 +1,119 @@
+"""Drill-down from intersections to the rows of the source data.
+
+``MemberIndex`` sorts the row positions of a DataFrame by membership code
+once, in compressed sparse row (CSR) layout, so the rows of any intersection
+are a contiguous slice found by binary search instead of a rescan of the data
+with one boolean condition per set.
+"""
+
+import numpy as np
+
+from .preprocessing import membership_codes
+
+# Element ids shown in the tooltip of each intersection
+MEMBER_SAMPLE = 5
+
+
+def intersection_code(sets, names):
+    """The membership code of the intersection of exactly the sets in ``names``."""
+    unknown = set(names) - set(sets)
+    if unknown:
+        raise KeyError(f"unknown sets: {', '.join(sorted(unknown))}")
+    code = 0
+    for i, s in enumerate(sets):
+        if s in names:
+            code |= 1 << (len(sets) - 1 - i)
+    return code
+
+
+class MemberIndex:
+    """Row positions of the elements of each intersection, in CSR layout.
+
+    ``positions`` lists the row positions sorted by membership code (stable,
+    so rows keep their order within an intersection), and
+    ``positions[offsets[i]:offsets[i + 1]]`` are the rows whose code is
+    ``codes[i]``. Codes are sorted, so ``i`` is also the intersection id
+    ``preprocess_data`` assigns.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        The membership code of each row (see ``membership_codes``).
+    empty_codes : numpy.ndarray, optional
+        Codes without rows that are indexed too, with empty slices, to match
+        the intersection ids of a chart built with ``include_empty``.
+    counted : numpy.ndarray of bool, optional
+        Which rows are counted. The others (such as rows without a group) are
+        left out of the index, while positions still refer to all rows.
+    """
+
+    def __init__(self, codes, empty_codes=None, counted=None):
+        codes = np.asarray(codes, dtype=np.uint64)
+        dtype = np.int32 if len(codes) < 2**31 else np.int64
+        rows = np.arange(len(codes)) if counted is None else np.flatnonzero(counted)
+        order = np.argsort(codes[rows], kind="stable")
+        self.positions = rows[order].astype(dtype)
+        sorted_codes = codes[self.positions]
+        self.codes = np.unique(sorted_codes)
+        if empty_codes is not None:
+            self.codes = np.union1d(self.codes, np.asarray(empty_codes, np.uint64))
+        starts = np.searchsorted(sorted_codes, self.codes)
+        self.offsets = np.append(starts, len(self.positions)).astype(np.int64)
+
+    @classmethod
+    def from_data(cls, data, sets, empty_codes=None, group_by=None):
+        """Indexes the rows of a pandas DataFrame by their set memberships.
+
+        Rows whose ``group_by`` value is missing are not counted, so they are
+        not indexed either.
+        """
+        counted = data[group_by].notna().to_numpy() if group_by is not None else None
+        return cls(membership_codes(data, sets), empty_codes, counted)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _slice(self, i):
+        return self.positions[self.offsets[i] : self.offsets[i + 1]]
+
+    def rows(self, code, mode="exclusive"):
+        """Row positions of the elements counted for ``code`` in ``mode``.
+
+        In exclusive mode this is a single slice. Inclusive and union modes
+        combine the slices of all codes whose elements count towards ``code``:
+        its supersets, or the codes sharing at least one set.
+        """
+        code = np.uint64(code)
+        if mode == "exclusive":
+            i = np.searchsorted(self.codes, code)
+            if i == len(self.codes) or self.codes[i] != code:
+                return self.positions[:0]
+            return self._slice(i)
+        if mode == "inclusive":
+            matching = (self.codes & code) == code
+        else:
+            matching = (self.codes & code) != 0
+        slices = [self._slice(i) for i in np.flatnonzero(matching)]
+        return np.sort(np.concatenate(slices)) if slices else self.positions[:0]
+
+
+def member_samples(index, intersection_ids, ids, mode="exclusive", groups=None):
+    """The first ``MEMBER_SAMPLE`` element ids of each intersection, joined.
+
+    Returns a dict keyed by intersection id, or by ``(group, intersection id)``
+    when the group of each row is given in ``groups``.
+    """
+    samples = {}
+    for intersection_id in intersection_ids:
+        rows = index.rows(index.codes[intersection_id], mode)
+        if groups is None:
+            chosen = {intersection_id: rows[:MEMBER_SAMPLE]}
+        else:
+            row_groups = groups[rows]
+            chosen = {
+                (group, intersection_id): rows[row_groups == group][:MEMBER_SAMPLE]
+                for group in np.unique(row_groups)
+            }
+        for key, sample in chosen.items():
+            samples[key] = ", ".join(str(i) for i in ids[sample])
+    return samples
@@ -1,47 +1,384 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
 import pandas as pd
 
+MODES = ("exclusive", "inclusive", "union")
 
-def preprocess_data(data, sets, abbre, sort_order):
-    """Handles the data preprocessing for UpSet plots."""
-    # Create a copy to avoid SettingWithCopyWarning
-    data = data.copy()
-    
-    # Handle empty input data
-    if len(data) == 0:
-        # Create empty result DataFrame with required columns
-        data = pd.DataFrame(columns=sets + ["count", "intersection_id", "degree"])
-        data = pd.melt(data, id_vars=["intersection_id", "count", "degree"])
-        data = data.rename(columns={"variable": "set", "value": "is_intersect"})
-        
-        if abbre is None:
-            abbre = sets
-            
-        set_to_abbre = pd.DataFrame(
-            [[sets[i], abbre[i]] for i in range(len(sets))], columns=["set", "set_abbre"]
+# Rows sampled by default when counting approximately
+SAMPLE_SIZE = 100_000
+
+# Intersections seen fewer times than this in a sample are flagged as
+# unreliable: below it the normal approximation behind the intervals breaks down
+MIN_RELIABLE_HITS = 10
+
+# Above this many sets the dense 2^k transform table gets too large and the
+# transforms fall back to pairwise bitmask tests over the observed codes.
+DENSE_TRANSFORM_MAX_SETS = 20
+
+# Most zero-count intersections (times groups) that include_empty may add
+MAX_EMPTY_INTERSECTIONS = 100_000
+
+# Aggregations that can be combined across chunks, with the partial results
+# each one is computed from and how those partials combine.
+MERGEABLE_OPS = {
+    "sum": ["sum"],
+    "count": ["count"],
+    "min": ["min"],
+    "max": ["max"],
+    "mean": ["sum", "count"],
+}
+PARTIAL_COMBINE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+
+def aggregate_fields(aggregates):
+    """Maps output field names to ``(column, op)`` pairs for an aggregates spec.
+
+    The field holding ``op`` applied to ``column`` is named ``"{column}_{op}"``,
+    e.g. ``{"age": "mean"}`` produces an ``age_mean`` field.
+    """
+    if not aggregates:
+        return {}
+    return {f"{column}_{op}": (column, op) for column, op in aggregates.items()}
+
+
+def membership_codes(data, sets):
+    """Encodes the set membership of each row as an integer bitmask.
+
+    The first set is the most significant bit, so sorting codes orders the
+    intersections the same way as grouping by the set columns.
+    """
+    if len(sets) > 64:
+        raise ValueError("at most 64 sets are supported")
+    codes = np.zeros(len(data), dtype=np.uint64)
+    for s in sets:
+        codes = (codes << np.uint64(1)) | data[s].to_numpy(dtype=np.uint64)
+    return codes
+
+
+def _dense_zeta(codes, values, n_sets, supersets):
+    """Fast zeta transform over the full 2^k lattice, read back at ``codes``."""
+    table = np.zeros(1 << n_sets, dtype=values.dtype)
+    np.add.at(table, codes.astype(np.int64), values)
+    for bit in range(n_sets):
+        pairs = table.reshape(-1, 2, 1 << bit)
+        if supersets:
+            pairs[:, 0, :] += pairs[:, 1, :]
+        else:
+            pairs[:, 1, :] += pairs[:, 0, :]
+    return table
+
+
+def superset_sums(codes, values, n_sets, at=None):
+    """Sums ``values`` over all supersets of each code in ``at``.
+
+    ``codes`` must be unique. ``at`` defaults to ``codes``.
+    """
+    at = codes if at is None else at
+    if n_sets <= DENSE_TRANSFORM_MAX_SETS:
+        return _dense_zeta(codes, values, n_sets, True)[at.astype(np.int64)]
+    return np.array([values[(codes & c) == c].sum() for c in at], dtype=values.dtype)
+
+
+def subset_sums(codes, values, n_sets, at=None):
+    """Sums ``values`` over all subsets of each code in ``at``.
+
+    ``codes`` must be unique. ``at`` defaults to ``codes``.
+    """
+    at = codes if at is None else at
+    if n_sets <= DENSE_TRANSFORM_MAX_SETS:
+        return _dense_zeta(codes, values, n_sets, False)[at.astype(np.int64)]
+    return np.array([values[(codes & ~c) == 0].sum() for c in at], dtype=values.dtype)
+
+
+def apply_mode(codes, counts, n_sets, mode):
+    """Turns exclusive intersection counts into ``mode`` counts.
+
+    - ``"exclusive"``: elements in exactly these sets
+    - ``"inclusive"``: elements in at least these sets (superset sum)
+    - ``"union"``: elements in any of these sets (total minus the subset sum of
+      the complement)
+    """
+    if mode == "exclusive":
+        return counts
+    if mode == "inclusive":
+        return superset_sums(codes, counts, n_sets)
+    full = np.uint64((1 << n_sets) - 1)
+    return counts.sum() - subset_sums(codes, counts, n_sets, at=codes ^ full)
+
+
+def popcount(codes):
+    """Counts the set bits of each code, i.e. the degree of each intersection."""
+    codes = np.asarray(codes, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(codes).astype(np.int64)
+    bits = np.unpackbits(codes.view(np.uint8).reshape(-1, 8), axis=1)
+    return bits.sum(axis=1).astype(np.int64)
+
+
+def combination_count(n_sets, max_degree):
+    """The number of combinations of 1 to ``max_degree`` out of ``n_sets`` sets."""
+    return sum(math.comb(n_sets, d) for d in range(1, max_degree + 1))
+
+
+def degree_combinations(n_sets, max_degree=None):
+    """Membership codes of every combination of 1 to ``max_degree`` sets, sorted.
+
+    Codes are built one degree at a time: each code is extended by every bit
+    below its lowest set bit, which yields every combination exactly once
+    without visiting the other codes of the 2^n lattice. Raises ValueError if
+    there are more than ``MAX_EMPTY_INTERSECTIONS`` combinations.
+    """
+    max_degree = n_sets if max_degree is None else min(max_degree, n_sets)
+    total = combination_count(n_sets, max_degree)
+    if total > MAX_EMPTY_INTERSECTIONS:
+        raise ValueError(
+            f"{total} combinations of up to {max_degree} of {n_sets} sets exceed "
+            f"the limit of {MAX_EMPTY_INTERSECTIONS}; lower max_degree"
         )
-        set_to_order = pd.DataFrame(
-            [[sets[i], 1 + sets.index(sets[i])] for i in range(len(sets))],
-            columns=["set", "set_order"],
+    bits = np.uint64(1) << np.arange(n_sets, dtype=np.uint64)
+    level = bits
+    levels = [level]
+    for _ in range(1, max_degree):
+        lowest = level & (~level + np.uint64(1))
+        rows, columns = np.nonzero(bits[None, :] < lowest[:, None])
+        level = level[rows] | bits[columns]
+        levels.append(level)
+    return np.sort(np.concatenate(levels))
+
+
+def add_empty_intersections(counts, sets, max_degree=None, group_by=None):
+    """Adds zero-count rows for unobserved combinations of up to ``max_degree`` sets.
+
+    ``counts`` is a table returned by ``count_intersections``. With
+    ``group_by``, every group gets the combinations it has not observed.
+    Aggregate fields of the added rows are missing.
+    """
+    codes = degree_combinations(len(sets), max_degree)
+    keys = [group_by] if group_by is not None else []
+    if keys:
+        groups = counts[group_by].drop_duplicates()
+        if len(codes) * len(groups) > MAX_EMPTY_INTERSECTIONS:
+            raise ValueError(
+                f"{len(codes)} combinations in each of {len(groups)} groups exceed "
+                f"the limit of {MAX_EMPTY_INTERSECTIONS}; lower max_degree"
+            )
+        empty = pd.DataFrame(
+            {
+                group_by: groups.repeat(len(codes)).reset_index(drop=True),
+                "code": np.tile(codes, len(groups)),
+            }
         )
-        return data, set_to_abbre, set_to_order, abbre
-    
-    # Process non-empty data
-    data.loc[:, "count"] = 0
-    data = data[sets + ["count"]]
-    data = data.groupby(sets).count().reset_index()
+    else:
+        empty = pd.DataFrame({"code": codes})
+
+    observed = counts[keys].assign(code=membership_codes(counts, sets))
+    unseen = ~pd.MultiIndex.from_frame(empty).isin(pd.MultiIndex.from_frame(observed))
+    empty = empty[unseen]
+    codes = empty.pop("code").to_numpy(dtype=np.uint64)
+    for i, s in enumerate(sets):
+        bit = np.uint64(len(sets) - 1 - i)
+        empty[s] = ((codes >> bit) & np.uint64(1)).astype(counts[s].dtype)
+    return pd.concat([counts, empty.assign(count=0)], ignore_index=True)
 
-    data["intersection_id"] = data.index
-    data["degree"] = data[sets].sum(axis=1)
-    data = data.sort_values(
-        by=["count"], ascending=True if sort_order == "ascending" else False
+
+def intersection_ranks(codes, counts, degrees, sort_by, sort_order):
+    """Computes the display position of each intersection.
+
+    Intersections are ordered by the ``sort_by`` key and then by the other key,
+    both in ``sort_order``. Remaining ties are broken by membership code, so
+    the order is the same in every renderer.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    degrees = np.asarray(degrees, dtype=np.int64)
+    primary, secondary = (
+        (counts, degrees) if sort_by == "frequency" else (degrees, counts)
     )
+    sign = 1 if sort_order == "ascending" else -1
+    order = np.lexsort((codes, sign * secondary, sign * primary))
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    return ranks
 
-    data = pd.melt(data, id_vars=["intersection_id", "count", "degree"])
-    data = data.rename(columns={"variable": "set", "value": "is_intersect"})
 
-    if abbre is None:
-        abbre = sets
+def sample_size_for_error(max_error, confidence=0.95):
+    """Rows to sample so that every share of the total is within ``max_error``.
+
+    Uses the worst case proportion of one half, so the bound holds for all
+    intersections, set sizes and groups alike.
+    """
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    return math.ceil(z**2 / (4 * max_error**2))
+
+
+def estimate_counts(hits, sampled, population, confidence=0.95):
+    """Scales sample counts up to the population, with confidence intervals.
+
+    ``hits`` are the counts in a uniform sample of ``sampled`` out of
+    ``population`` rows (arrays broadcast, e.g. one value per group). The
+    intervals are Wilson score intervals with a finite population correction,
+    so they shrink to the exact count when every row is sampled. Returns the
+    ``count``, ``count_lower``, ``count_upper`` and ``reliable`` columns.
+    """
+    hits = np.asarray(hits, dtype=np.float64)
+    sampled = np.asarray(sampled, dtype=np.float64)
+    population = np.asarray(population, dtype=np.float64)
+    share = hits / sampled
+    fpc = np.sqrt(
+        np.clip(population - sampled, 0, None) / np.maximum(population - 1, 1)
+    )
+    z = NormalDist().inv_cdf((1 + confidence) / 2) * fpc
+    denominator = 1 + z**2 / sampled
+    center = (share + z**2 / (2 * sampled)) / denominator
+    half_width = (
+        z
+        * np.sqrt(share * (1 - share) / sampled + z**2 / (4 * sampled**2))
+        / denominator
+    )
+    # At least the sampled elements are in the intersection
+    lower = np.maximum(np.floor(population * (center - half_width)), hits)
+    upper = np.minimum(np.ceil(population * (center + half_width)), population)
+    return {
+        "count": np.rint(share * population).astype(np.int64),
+        "count_lower": lower.astype(np.int64),
+        "count_upper": upper.astype(np.int64),
+        "reliable": hits >= MIN_RELIABLE_HITS,
+    }
+
+
+def partial_fields(aggregates):
+    """Maps partial column names to ``(column, part)`` for mergeable aggregates."""
+    parts = {}
+    for field, (column, op) in aggregate_fields(aggregates).items():
+        if op not in MERGEABLE_OPS:
+            raise ValueError(
+                f"aggregate '{op}' cannot be merged across chunks; use one of "
+                f"{', '.join(MERGEABLE_OPS)}"
+            )
+        for part in MERGEABLE_OPS[op]:
+            parts[f"{field}__{part}"] = (column, part)
+    return parts
+
+
+def partial_counts(data, sets, aggregates=None, group_by=None):
+    """Counts the intersections of one chunk of rows.
+
+    Aggregates are stored as partial results (sums, counts, minima, maxima) so
+    that the counts of many chunks can be combined with
+    ``merge_partial_counts`` and turned into final values with
+    ``finalize_partial_counts``.
+
+    Rows with missing set memberships would be dropped by the groupby, so they
+    raise the ValueError the pandas path raises for non-binary values.
+    """
+    if data[sets].isna().any().any():
+        raise ValueError("all set columns must contain only 0s and 1s")
+    keys = [group_by] if group_by is not None else []
+    parts = partial_fields(aggregates)
+    columns = keys + sets + list(dict.fromkeys(c for c, _ in parts.values()))
+    return (
+        data[columns]
+        .assign(count=0)
+        .groupby(keys + sets, observed=True)
+        .agg(count=("count", "size"), **parts)
+        .reset_index()
+    )
+
+
+def merge_partial_counts(partials, sets, aggregates=None, group_by=None):
+    """Combines partial counts of disjoint chunks into one partial table."""
+    keys = [group_by] if group_by is not None else []
+    combine = {"count": "sum"}
+    for name, (_, part) in partial_fields(aggregates).items():
+        combine[name] = PARTIAL_COMBINE[part]
+    return (
+        pd.concat(partials, ignore_index=True)
+        .groupby(keys + sets, observed=True)
+        .agg(combine)
+        .reset_index()
+    )
 
+
+def finalize_partial_counts(partial, sets, aggregates=None, group_by=None):
+    """Turns merged partial counts into the table ``count_intersections`` returns."""
+    keys = [group_by] if group_by is not None else []
+    result = partial[keys + sets + ["count"]].copy()
+    for field, (_, op) in aggregate_fields(aggregates).items():
+        if op == "mean":
+            result[field] = partial[f"{field}__sum"] / partial[f"{field}__count"]
+        else:
+            result[field] = partial[f"{field}__{op}"]
+    return result
+
+
+def count_intersections(data, sets, aggregates=None, group_by=None, engine="pandas"):
+    """Counts the elements of each observed combination of set memberships.
+
+    Returns one row per combination (and group), holding the set columns, a
+    ``count`` column and one column per aggregate field. Besides pandas
+    DataFrames, ``data`` may be any input supported by ``altair_upset.sources``
+    (Dask DataFrames, Parquet/Arrow paths), which is counted in chunks so that
+    only the aggregated table is held in memory.
+
+    ``engine`` names the backend that counts a pandas DataFrame (see
+    ``altair_upset.engines``); this groupby is the ``"pandas"`` reference.
+    Other inputs are counted by their source.
+    """
+    if not isinstance(data, pd.DataFrame):
+        from .sources import count_source
+
+        return count_source(data, sets, aggregates, group_by)
+    if engine != "pandas":
+        from .engines import get_engine
+
+        engine = get_engine(engine, data, sets, aggregates, group_by)
+        return engine.count(data, sets, aggregates, group_by)
+
+    keys = [group_by] if group_by is not None else []
+    fields = aggregate_fields(aggregates)
+    columns = keys + sets + list(dict.fromkeys(c for c, _ in fields.values()))
+    return (
+        data[columns]
+        .assign(count=0)
+        .groupby(keys + sets, observed=True)
+        .agg(count=("count", "size"), **fields)
+        .reset_index()
+    )
+
+
+def compact_dtypes(data, sets):
+    """Stores the long table in the narrowest dtypes that hold its values.
+
+    ``set`` becomes a categorical ordered like ``sets``, ``is_intersect`` an
+    ``int8`` and the integer columns the smallest signed integer type that fits.
+    Counts keep at least ``int32``, so that sums over them don't overflow.
+    ``set_abbre`` and ``set_order`` are compacted too when present.
+    """
+    data = data.astype({"set": pd.CategoricalDtype(sets), "is_intersect": "int8"})
+    if "set_abbre" in data:
+        data = data.astype({"set_abbre": "category", "set_order": "int8"})
+    if "reliable" in data:
+        data = data.astype({"reliable": "bool"})
+    counts = ["count", "set_size", "count_lower", "count_upper"]
+    for column in ["intersection_id", "degree", "rank"] + counts:
+        if column in data:
+            data[column] = pd.to_numeric(data[column], downcast="integer")
+            if column in counts and data[column].dtype.kind == "i":
+                dtype = np.promote_types(data[column].dtype, np.int32)
+                data[column] = data[column].astype(dtype)
+    return data
+
+
+def add_set_attributes(data, sets, abbre):
+    """Adds each row's set abbreviation and 1-based set order as columns."""
+    return data.assign(
+        set_abbre=data["set"].map(dict(zip(sets, abbre))),
+        set_order=(data["set"].cat.codes + 1).astype("int8"),
+    )
+
+
+def _set_tables(sets, abbre):
     set_to_abbre = pd.DataFrame(
         [[sets[i], abbre[i]] for i in range(len(sets))], columns=["set", "set_abbre"]
     )
@@ -49,5 +386,191 @@ def preprocess_data(data, sets, abbre, sort_order):
         [[sets[i], 1 + sets.index(sets[i])] for i in range(len(sets))],
         columns=["set", "set_order"],
     )
+    return set_to_abbre, set_to_order
+
+
+def preprocess_data(
+    data,
+    sets,
+    abbre,
+    sort_order,
+    aggregates=None,
+    mode="exclusive",
+    sort_by="frequency",
+    group_by=None,
+    max_intersections=None,
+    sample_size=None,
+    confidence=0.95,
+    random_state=None,
+    include_empty=False,
+    max_degree=None,
+    return_index=False,
+    engine="auto",
+):
+    """Handles the data preprocessing for UpSet plots.
+
+    Everything the chart shows is computed here: intersection counts, degrees,
+    set sizes and the display rank of each intersection, so the Vega-Lite spec
+    only has to encode plain fields.
+
+    ``aggregates`` maps additional columns of ``data`` to a pandas aggregation
+    (``"mean"``, ``"median"``, ...). They are computed in the same groupby as
+    the intersection counts and carried along on every row of the result.
+
+    ``mode`` selects exclusive, inclusive or union counts; the latter two are
+    derived from the exclusive counts without rescanning ``data``.
+
+    ``group_by`` names a column to count intersections separately for each of
+    its values, in the same grouping pass. Intersection ids and ranks are shared
+    by all groups so that their charts line up; counts and set sizes are per
+    group.
+
+    ``max_intersections`` keeps only that many of the largest intersections
+    (by total count, ties broken by membership); set sizes still cover all
+    elements.
+
+    With ``sample_size``, intersections are counted in a random sample of that
+    many rows (per group, proportionally to the group sizes) and scaled up to
+    the full data. ``count_lower`` and ``count_upper`` then hold the
+    ``confidence`` interval of each count and ``reliable`` is False for
+    intersections seen fewer than ``MIN_RELIABLE_HITS`` times; set sizes are
+    scaled estimates.
+
+    ``include_empty`` adds the combinations of up to ``max_degree`` sets (all
+    sets by default) that no element belongs to, with a count of zero (see
+    ``add_empty_intersections``). Observed intersections of higher degree are
+    kept.
+
+    With ``return_index``, an ``IntersectionIndex`` of the exclusive counts of
+    all counted intersections (before ``max_intersections``; estimated when
+    sampling) is returned as a fifth value, for answering set queries without
+    the elements.
+
+    ``engine`` selects the backend that counts a pandas DataFrame; all of them
+    return the same table (see ``altair_upset.engines``).
+
+    The result uses compact dtypes (see ``compact_dtypes``): ``set`` is a
+    categorical and the integer columns are downcast. Every row also carries
+    its set's ``set_abbre`` and ``set_order``, so the chart needs no lookups;
+    the ``set_to_abbre`` and ``set_to_order`` tables are still returned.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    if aggregates and mode != "exclusive":
+        raise ValueError("aggregates are only supported in exclusive mode")
+    fields = aggregate_fields(aggregates)
+    keys = [group_by] if group_by is not None else []
+    id_vars = keys + ["intersection_id", "count", "degree", "rank"] + list(fields)
+    if sample_size is not None:
+        if aggregates:
+            raise ValueError("aggregates are not supported on a sample")
+        id_vars += ["count_lower", "count_upper", "reliable"]
+
+    if abbre is None:
+        abbre = sets
+    set_to_abbre, set_to_order = _set_tables(sets, abbre)
+
+    if sample_size is not None:
+        from .sources import sample_rows
+
+        data, population = sample_rows(data, sample_size, group_by, random_state)
+        sampled = data[group_by].value_counts() if keys else len(data)
+
+    # Counts and aggregates in a single grouping pass
+    data = count_intersections(data, sets, aggregates, group_by, engine)
+    if include_empty:
+        data = add_empty_intersections(data, sets, max_degree, group_by)
+
+    # Handle empty input data
+    if len(data) == 0:
+        # Create empty result DataFrame with required columns
+        data = pd.DataFrame(columns=sets + id_vars + ["set_size"])
+        data = pd.melt(data, id_vars=id_vars + ["set_size"])
+        data = data.rename(columns={"variable": "set", "value": "is_intersect"})
+        data = add_set_attributes(compact_dtypes(data, sets), sets, abbre)
+        if return_index:
+            from .query import IntersectionIndex
+
+            groups = np.array([]) if keys else None
+            index = IntersectionIndex([], [], sets, groups, group_by)
+            return data, set_to_abbre, set_to_order, abbre, index
+        return data, set_to_abbre, set_to_order, abbre
+
+    codes = membership_codes(data, sets)
+    data["intersection_id"] = np.unique(codes, return_inverse=True)[1]
+
+    # Set sizes are always the exclusive counts summed over each set's members
+    members = data[sets].mul(data["count"], axis=0)
+    set_sizes = (
+        members.groupby(data[group_by], observed=True).sum()
+        if keys
+        else members.sum().to_frame().T
+    )
+    set_sizes = set_sizes.melt(
+        ignore_index=False, var_name="set", value_name="set_size"
+    ).reset_index()
+
+    counts = data["count"].to_numpy(copy=True)
+    exclusive = counts.copy()
+    groups = data.groupby(keys).indices.values() if keys else [np.arange(len(data))]
+    for rows in groups:
+        counts[rows] = apply_mode(codes[rows], counts[rows], len(sets), mode)
+    data["count"] = counts
+    data["degree"] = popcount(codes)
+
+    # Sample counts become estimates of the full data, set sizes included
+    if sample_size is not None:
+        if keys:
+            row_sampled = data[group_by].map(sampled).to_numpy()
+            row_population = data[group_by].map(population).to_numpy()
+            scale = set_sizes[group_by].map(population / sampled).to_numpy()
+        else:
+            row_sampled, row_population = sampled, population
+            scale = population / sampled
+        estimates = estimate_counts(counts, row_sampled, row_population, confidence)
+        exclusive = np.rint(exclusive * (row_population / row_sampled))
+        data = data.assign(**estimates)
+        set_sizes["set_size"] = np.rint(set_sizes["set_size"] * scale).astype(np.int64)
+
+    if return_index:
+        from .query import IntersectionIndex
+
+        row_groups = data[group_by].to_numpy() if keys else None
+        index = IntersectionIndex(
+            codes, exclusive.astype(np.int64), sets, row_groups, group_by
+        )
+
+    # Elements outside every set are not an intersection
+    nonempty = data["degree"].to_numpy() > 0
+    data, codes = data[nonempty], codes[nonempty]
+
+    # Rank intersections by their totals so that all groups share one order
+    totals = data.groupby("intersection_id").agg(
+        count=("count", "sum"), degree=("degree", "first")
+    )
+    unique_codes = np.unique(codes)
+    if max_intersections is not None and len(totals) > max_intersections:
+        order = intersection_ranks(
+            unique_codes, totals["count"], totals["degree"], "frequency", "descending"
+        )
+        largest = order < max_intersections
+        kept = data["intersection_id"].isin(totals.index[largest]).to_numpy()
+        data, codes = data[kept], codes[kept]
+        totals, unique_codes = totals[largest], unique_codes[largest]
+    ranks = intersection_ranks(
+        unique_codes, totals["count"], totals["degree"], sort_by, sort_order
+    )
+    rank_of = pd.Series(ranks, index=totals.index)
+    data = data.assign(rank=rank_of[data["intersection_id"]].to_numpy())
+    data = data.sort_values(keys + ["rank"])
+
+    data = pd.melt(data, id_vars=id_vars)
+    data = data.rename(columns={"variable": "set", "value": "is_intersect"})
+    data = data.merge(
+        set_sizes[keys + ["set", "set_size"]], on=keys + ["set"], how="left"
+    )
 
+    data = add_set_attributes(compact_dtypes(data, sets), sets, abbre)
+    if return_index:
+        return data, set_to_abbre, set_to_order, abbre, index
     return data, set_to_abbre, set_to_order, abbre
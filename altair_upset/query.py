@@ -0,0 +1,97 @@
+"""Set queries answered from the counted intersections.
+
+Every element belongs to exactly one exclusive intersection, so the number of
+elements in some sets and not in others is the sum of the exclusive counts of
+the membership codes that have the included bits set and the excluded bits
+clear. ``IntersectionIndex`` keeps those codes and counts, so a query is two
+bitmask tests over the intersections instead of a scan of the elements.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .members import intersection_code
+from .preprocessing import popcount
+
+
+class IntersectionIndex:
+    """Exclusive counts of every counted membership code.
+
+    ``codes`` are the sorted unique codes, so the position of a code is also
+    the intersection id ``preprocess_data`` assigns.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        The membership code of each counted row.
+    counts : numpy.ndarray
+        The exclusive count of each counted row.
+    sets : list of str
+        The set names, first set as the most significant bit.
+    groups : numpy.ndarray, optional
+        The group of each counted row, when counted by ``group_by``.
+    group_by : str, optional
+        The name of the group column.
+    """
+
+    def __init__(self, codes, counts, sets, groups=None, group_by=None):
+        self.codes, self.ids = np.unique(
+            np.asarray(codes, dtype=np.uint64), return_inverse=True
+        )
+        self.counts = np.asarray(counts)
+        self.sets = list(sets)
+        self.groups = groups
+        self.group_by = group_by
+
+    def __len__(self):
+        return len(self.codes)
+
+    def matching(self, include=(), exclude=()):
+        """Boolean mask over ``codes`` of the codes in all of ``include`` and
+        none of ``exclude``."""
+        overlap = set(include) & set(exclude)
+        if overlap:
+            raise ValueError(
+                f"sets both included and excluded: {', '.join(sorted(overlap))}"
+            )
+        included = np.uint64(intersection_code(self.sets, include))
+        excluded = np.uint64(intersection_code(self.sets, exclude))
+        return ((self.codes & included) == included) & ((self.codes & excluded) == 0)
+
+    def query(self, include=(), exclude=()):
+        """Counts the elements in all sets of ``include`` and none of ``exclude``.
+
+        Returns a dict with the total ``count`` (a Series indexed by group when
+        counted by group) and the matching ``intersections``: one row per
+        intersection (and group) with its ``intersection_id``, the ``sets`` it
+        consists of, its ``degree`` and exclusive ``count``, largest first.
+        """
+        rows = self.matching(include, exclude)[self.ids]
+        ids = self.ids[rows]
+        codes = self.codes[ids]
+        bits = np.arange(len(self.sets) - 1, -1, -1, dtype=np.uint64)
+        members = ((codes[:, None] >> bits) & np.uint64(1)).astype(bool)
+        intersections = pd.DataFrame(
+            {
+                "intersection_id": ids,
+                "sets": [
+                    tuple(s for s, m in zip(self.sets, member) if m)
+                    for member in members
+                ],
+                "degree": popcount(codes),
+                "count": self.counts[rows],
+            }
+        )
+        if self.groups is None:
+            count = int(self.counts[rows].sum())
+        else:
+            intersections.insert(0, self.group_by, self.groups[rows])
+            count = (
+                intersections.groupby(self.group_by, observed=True)["count"]
+                .sum()
+                .reindex(pd.unique(self.groups), fill_value=0)
+            )
+        intersections = intersections.sort_values(
+            ["count", "intersection_id"], ascending=[False, True], ignore_index=True
+        )
+        return {"count": count, "intersections": intersections}
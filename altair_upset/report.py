@@ -0,0 +1,140 @@
+"""Many charts in one HTML document.
+
+Saving each chart as HTML repeats the Vega, Vega-Lite and vega-embed script
+tags and the full inline data in every file. A report loads the runtime once,
+stores every dataset once (Altair names datasets by a hash of their content,
+so charts of the same data share one entry) and only renders a chart when its
+placeholder scrolls into view.
+"""
+
+import html
+import json
+import os
+from string import Template
+
+import altair as alt
+
+BASE_URL = "https://cdn.jsdelivr.net/npm"
+
+# Charts are rendered once their placeholder is this close to the viewport
+LAZY_MARGIN = "400px"
+
+REPORT_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="UTF-8">
+  <title>$title</title>
+  <script type="text/javascript" src="$base_url/vega@$vega_version"></script>
+  <script type="text/javascript" src="$base_url/vega-lite@$vegalite_version"></script>
+  <script type="text/javascript" src="$base_url/vega-embed@$vegaembed_version"></script>
+  <style>
+    .upset-chart { min-height: 200px; margin-bottom: 2em; }
+  </style>
+</head>
+<body>
+$heading$sections
+  <script type="application/json" id="upset-report">$payload</script>
+  <script>
+    (function() {
+      const report = JSON.parse(document.getElementById("upset-report").textContent);
+      function render(element) {
+        const chart = report.charts[Number(element.dataset.chart)];
+        const datasets = {};
+        for (const name of chart.datasets) {
+          datasets[name] = report.datasets[name];
+        }
+        const spec = Object.assign({}, chart.spec, {datasets: datasets});
+        vegaEmbed(element, spec).catch(console.error);
+      }
+      const elements = document.querySelectorAll(".upset-chart");
+      if (!("IntersectionObserver" in window)) {
+        elements.forEach(render);
+        return;
+      }
+      const observer = new IntersectionObserver(function(entries) {
+        for (const entry of entries) {
+          if (entry.isIntersecting) {
+            observer.unobserve(entry.target);
+            render(entry.target);
+          }
+        }
+      }, {rootMargin: "$lazy_margin"});
+      elements.forEach(function(element) { observer.observe(element); });
+    })();
+  </script>
+</body>
+</html>
+""")
+
+
+def report_payload(charts):
+    """Splits the specs of ``charts`` from their deduplicated datasets.
+
+    Returns ``{"datasets": {name: values}, "charts": [{"spec", "datasets"}]}``
+    where each chart's spec has no ``datasets`` and lists the names it needs.
+    """
+    datasets = {}
+    entries = []
+    for chart in charts:
+        spec = dict(chart.to_dict())
+        own = spec.pop("datasets", {})
+        datasets.update(own)
+        entries.append({"spec": spec, "datasets": sorted(own)})
+    return {"datasets": datasets, "charts": entries}
+
+
+def report_html(charts, title="", chart_titles=None):
+    """Renders ``charts`` into one HTML document; see ``save_report``."""
+    charts = list(charts)
+    if chart_titles is not None and len(chart_titles) != len(charts):
+        raise ValueError("chart_titles must have one title per chart")
+    sections = []
+    for i in range(len(charts)):
+        section = ""
+        if chart_titles is not None:
+            section += f"  <h2>{html.escape(str(chart_titles[i]))}</h2>\n"
+        section += f'  <div class="upset-chart" data-chart="{i}"></div>\n'
+        sections.append(section)
+
+    # Keep the JSON from closing the script element it is embedded in
+    payload = json.dumps(report_payload(charts), separators=(",", ":"))
+    payload = payload.replace("</", "<\\/")
+    return REPORT_TEMPLATE.substitute(
+        title=html.escape(title),
+        heading=f"  <h1>{html.escape(title)}</h1>\n" if title else "",
+        sections="".join(sections),
+        payload=payload,
+        base_url=BASE_URL,
+        vega_version=alt.VEGA_VERSION,
+        vegalite_version=alt.VEGALITE_VERSION,
+        vegaembed_version=alt.VEGAEMBED_VERSION,
+        lazy_margin=LAZY_MARGIN,
+    )
+
+
+def save_report(charts, filename, title="", chart_titles=None):
+    """Saves many charts to one HTML document.
+
+    The Vega runtime is loaded once, each distinct dataset is stored once and
+    charts are rendered lazily as they scroll into view, so reports of
+    hundreds of charts stay small and open quickly.
+
+    Parameters
+    ----------
+    charts : iterable of UpSetChart or Altair charts
+        The charts, in page order.
+    filename : str or path-like
+        The HTML file to write.
+    title : str, optional
+        Title of the page.
+    chart_titles : list of str, optional
+        A heading above each chart.
+
+    Examples
+    --------
+    >>> charts = [au.UpSetAltair(df, sets) for df in frames]
+    >>> au.save_report(charts, "report.html", title="Weekly overlaps")
+    """
+    document = report_html(charts, title, chart_titles)
+    with open(os.fspath(filename), "w", encoding="utf-8") as file:
+        file.write(document)
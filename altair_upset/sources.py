@@ -0,0 +1,323 @@
+"""Intersection counting for data that does not fit in a pandas DataFrame."""
+
+import contextlib
+import os
+
+import pandas as pd
+
+from .preprocessing import (
+    finalize_partial_counts,
+    merge_partial_counts,
+    partial_counts,
+    partial_fields,
+)
+
+# How many partial tables are merged at each level of a tree reduction.
+SPLIT_EVERY = 8
+
+# Rows per record batch when streaming files.
+BATCH_SIZE = 1 << 16
+
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.bz2")
+
+UNSUPPORTED_DATA = (
+    "data must be a pandas or Dask DataFrame, a SQLSource or FileSource, or a "
+    "path to a Parquet/Arrow/CSV file or dataset"
+)
+
+# SQL aggregate functions for each kind of partial result.
+SQL_PARTIALS = {"sum": "SUM", "count": "COUNT", "min": "MIN", "max": "MAX"}
+
+
+def is_dask_frame(data):
+    """Whether ``data`` is a Dask DataFrame, without importing Dask."""
+    return type(data).__module__.split(".")[0] in ("dask", "dask_expr") and hasattr(
+        data, "map_partitions"
+    )
+
+
+def is_file_source(data):
+    """Whether ``data`` is a file path, directory or ``pyarrow.dataset.Dataset``."""
+    return isinstance(data, (str, os.PathLike)) or type(data).__module__.startswith(
+        "pyarrow._dataset"
+    )
+
+
+def source_columns(data):
+    """Column names of any supported input, without reading its rows.
+
+    Besides DataFrames and paths, any object with a ``columns`` attribute and a
+    ``partial_counts(sets, aggregates, group_by)`` method (such as
+    ``SQLSource``) is an input. Raises ``TypeError`` for unsupported inputs.
+    """
+    if (
+        isinstance(data, pd.DataFrame)
+        or is_dask_frame(data)
+        or hasattr(data, "partial_counts")
+    ):
+        return list(data.columns)
+    if is_file_source(data):
+        return FileSource(data).columns
+    raise TypeError(UNSUPPORTED_DATA)
+
+
+def sample_rows(data, sample_size, group_by=None, random_state=None):
+    """Draws a uniform random sample of about ``sample_size`` rows.
+
+    With ``group_by`` the sample is stratified: every group is sampled at the
+    same rate. Returns the sample as a pandas DataFrame together with the
+    number of rows of the full data, per group if ``group_by`` is given.
+    """
+    if is_dask_frame(data):
+        total = len(data)
+        fraction = min(1.0, sample_size / total) if total else 1.0
+        sample = data.sample(frac=fraction, random_state=random_state).compute()
+        population = (
+            data[group_by].value_counts().compute() if group_by is not None else total
+        )
+        return sample, population
+    if not isinstance(data, pd.DataFrame):
+        raise TypeError("sampling needs a pandas or Dask DataFrame")
+    if group_by is None:
+        n = min(sample_size, len(data))
+        return data.sample(n=n, random_state=random_state), len(data)
+    fraction = min(1.0, sample_size / len(data)) if len(data) else 1.0
+    sample = data.groupby(group_by, observed=True, group_keys=False).sample(
+        frac=fraction, random_state=random_state
+    )
+    return sample, data[group_by].value_counts()
+
+
+def source_partial_counts(data, sets, aggregates=None, group_by=None):
+    """Merged partial counts (see ``partial_counts``) of any supported input.
+
+    Set values can't be checked row by row up front, so they are checked on
+    the aggregated table instead.
+    """
+    if isinstance(data, pd.DataFrame):
+        partial = partial_counts(data, sets, aggregates, group_by)
+    elif is_dask_frame(data):
+        partial = dask_partial_counts(data, sets, aggregates, group_by)
+    elif is_file_source(data):
+        partial = file_partial_counts(data, sets, aggregates, group_by)
+    elif hasattr(data, "partial_counts"):
+        partial = data.partial_counts(sets, aggregates, group_by)
+    else:
+        raise TypeError(UNSUPPORTED_DATA)
+    if not partial[sets].isin([0, 1]).all().all():
+        raise ValueError("all set columns must contain only 0s and 1s")
+    return partial
+
+
+def count_source(data, sets, aggregates=None, group_by=None):
+    """Counts intersections of a Dask DataFrame, SQL table or Parquet/Arrow source."""
+    partial = source_partial_counts(data, sets, aggregates, group_by)
+    return finalize_partial_counts(partial, sets, aggregates, group_by)
+
+
+def dask_partial_counts(data, sets, aggregates=None, group_by=None):
+    """Partial counts of a Dask DataFrame, computed without collecting its rows.
+
+    Each partition is counted with ``map_partitions`` and the per-partition
+    tables are merged in a tree reduction, so only aggregated tables ever
+    leave the workers. Runs on the currently configured Dask scheduler.
+    """
+    import dask
+
+    keys = [group_by] if group_by is not None else []
+    columns = keys + sets + list(aggregates or {})
+    meta = partial_counts(data._meta[columns], sets, aggregates, group_by)
+    partials = (
+        data[columns]
+        .map_partitions(partial_counts, sets, aggregates, group_by, meta=meta)
+        .to_delayed()
+    )
+
+    def merge(chunk):
+        return merge_partial_counts(chunk, sets, aggregates, group_by)
+
+    while len(partials) > 1:
+        partials = [
+            dask.delayed(merge)(partials[i : i + SPLIT_EVERY])
+            for i in range(0, len(partials), SPLIT_EVERY)
+        ]
+    (merged,) = dask.compute(partials[0])
+    return merged
+
+
+def count_dask_intersections(data, sets, aggregates=None, group_by=None):
+    """Counts intersections of a Dask DataFrame without collecting its rows."""
+    partial = dask_partial_counts(data, sets, aggregates, group_by)
+    return finalize_partial_counts(partial, sets, aggregates, group_by)
+
+
+def _open_dataset(source):
+    """Opens a path as a memory-mapped ``pyarrow.dataset.Dataset``."""
+    import pyarrow.dataset as ds
+    from pyarrow.fs import LocalFileSystem
+
+    if not isinstance(source, (str, os.PathLike)):
+        return source
+    path = os.fspath(source)
+    if path.endswith(ARROW_SUFFIXES):
+        file_format = "ipc"
+    elif path.endswith(CSV_SUFFIXES):
+        file_format = "csv"
+    else:
+        file_format = "parquet"
+    return ds.dataset(
+        path, format=file_format, filesystem=LocalFileSystem(use_mmap=True)
+    )
+
+
+def file_partial_counts(
+    source, sets, aggregates=None, group_by=None, batch_size=BATCH_SIZE
+):
+    """Partial counts of a Parquet/Arrow/CSV file or dataset directory.
+
+    Only the set, group and aggregate columns are read, one record batch at a
+    time from memory-mapped files, and counts are merged as batches arrive.
+    Memory use is bounded by the batch size and the number of intersections,
+    not by the size of the file.
+    """
+    keys = [group_by] if group_by is not None else []
+    columns = keys + sets + list(aggregates or {})
+    merged = None
+    for batch in _open_dataset(source).to_batches(
+        columns=columns, batch_size=batch_size
+    ):
+        if batch.num_rows == 0:
+            continue
+        partial = partial_counts(batch.to_pandas(), sets, aggregates, group_by)
+        merged = (
+            partial
+            if merged is None
+            else merge_partial_counts([merged, partial], sets, aggregates, group_by)
+        )
+    if merged is None:
+        merged = partial_counts(
+            pd.DataFrame(columns=columns), sets, aggregates, group_by
+        )
+    return merged
+
+
+def count_file_intersections(
+    source, sets, aggregates=None, group_by=None, batch_size=BATCH_SIZE
+):
+    """Counts intersections of a Parquet/Arrow/CSV file or dataset directory.
+
+    See ``file_partial_counts`` for how the file is read.
+    """
+    partial = file_partial_counts(source, sets, aggregates, group_by, batch_size)
+    return finalize_partial_counts(partial, sets, aggregates, group_by)
+
+
+class FileSource:
+    """A Parquet, Arrow IPC or CSV file or dataset directory, read in batches.
+
+    Plain paths passed as ``data`` are read the same way; wrap them to choose
+    how many rows are read and counted at a time.
+
+    Parameters
+    ----------
+    path : str or path-like
+        The file or directory. The format follows the suffix: ``.arrow``,
+        ``.feather`` and ``.ipc`` are Arrow IPC, ``.csv`` (optionally
+        compressed) is CSV and anything else is Parquet.
+    batch_size : int, default 65536
+        Rows per record batch.
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        self.path = path
+        self.batch_size = batch_size
+
+    @property
+    def columns(self):
+        """Column names of the file, read from its schema."""
+        return _open_dataset(self.path).schema.names
+
+    def partial_counts(self, sets, aggregates=None, group_by=None):
+        """Counts the intersections batch by batch."""
+        return file_partial_counts(
+            self.path, sets, aggregates, group_by, self.batch_size
+        )
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class SQLSource:
+    """A database table or query whose intersections are counted in the database.
+
+    Pass it as ``data`` to ``UpSetAltair`` or ``preprocess_data``. The counts
+    are computed by a single ``GROUP BY`` over the set columns, so only one row
+    per intersection is transferred, whatever the size of the table.
+
+    Parameters
+    ----------
+    connection : DB-API connection or cursor
+        For example a ``sqlite3`` or ``duckdb`` connection.
+    table : str, optional
+        Name of the table to count. Quoted as a single identifier; use
+        ``query`` for schema-qualified names.
+    query : str, optional
+        A ``SELECT`` statement whose result is counted; a trailing ``;`` is
+        dropped. Exactly one of ``table`` and ``query`` must be given.
+
+    Examples
+    --------
+    >>> import sqlite3
+    >>> source = au.SQLSource(sqlite3.connect("members.db"), table="members")
+    >>> chart = au.UpSetAltair(source, sets=["a", "b"])
+    """
+
+    def __init__(self, connection, table=None, query=None):
+        if (table is None) == (query is None):
+            raise ValueError("exactly one of table or query must be given")
+        self.connection = connection
+        if query is not None:
+            # The query is wrapped as a subquery, which can't end a statement
+            query = query.strip().rstrip(";").rstrip()
+        self.relation = _quote(table) if table is not None else f"({query})"
+
+    @contextlib.contextmanager
+    def _execute(self, sql):
+        """Runs ``sql`` on a new cursor, closed afterwards, or on the cursor
+        given as ``connection``, which is left open."""
+        owned = hasattr(self.connection, "cursor")
+        cursor = self.connection.cursor() if owned else self.connection
+        try:
+            cursor.execute(sql)
+            yield cursor
+        finally:
+            if owned:
+                cursor.close()
+
+    @property
+    def columns(self):
+        """Column names of the table or query, read without fetching rows."""
+        with self._execute(f"SELECT * FROM {self.relation} AS t LIMIT 0") as cursor:
+            return [column[0] for column in cursor.description]
+
+    def group_by_sql(self, sets, aggregates=None, group_by=None):
+        """The ``GROUP BY`` statement that computes the partial counts."""
+        keys = [_quote(c) for c in ([group_by] if group_by is not None else [])]
+        keys += [_quote(s) for s in sets]
+        selected = keys + ['COUNT(*) AS "count"']
+        for name, (column, part) in partial_fields(aggregates).items():
+            selected.append(f"{SQL_PARTIALS[part]}({_quote(column)}) AS {_quote(name)}")
+        return (
+            f"SELECT {', '.join(selected)} FROM {self.relation} AS t "
+            f"GROUP BY {', '.join(keys)}"
+        )
+
+    def partial_counts(self, sets, aggregates=None, group_by=None):
+        """Runs the ``GROUP BY`` in the database."""
+        with self._execute(self.group_by_sql(sets, aggregates, group_by)) as cursor:
+            names = [column[0] for column in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=names)
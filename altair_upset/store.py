@@ -0,0 +1,264 @@
+"""Counted intersections that can be merged, serialized and charted again.
+
+Counting is the only step of building a chart that reads every element. Its
+result, one row per intersection (and group) holding the membership code, the
+count and the partial aggregates, is kept in a ``PartialCounts`` object. Such
+objects are computed where the data lives, merged with ``+`` and shipped as
+Arrow IPC bytes; the set names and abbreviations travel in the schema
+metadata. ``save_intersections`` writes them to an uncompressed Arrow IPC file
+that ``IntersectionStore`` memory-maps, so regenerating a chart only reads the
+intersections.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .preprocessing import membership_codes, merge_partial_counts, partial_fields
+from .sources import source_columns, source_partial_counts
+
+# Bumped whenever the layout of the serialized table changes incompatibly
+FORMAT_VERSION = 1
+
+METADATA_KEY = b"altair_upset"
+
+
+class PartialCounts:
+    """Intersection counts of part of the data, mergeable with other parts.
+
+    Counts of disjoint chunks of rows combine with ``merge`` or ``+`` (also
+    ``sum`` over a list) into exactly the counts of all rows, whatever the
+    order. Aggregates are kept as partial sums, counts, minima and maxima, so
+    only mergeable operations (sum, count, min, max, mean) are supported.
+
+    A ``PartialCounts`` is accepted as ``data`` by ``UpSetAltair`` with any
+    subset of its sets; ``to_chart`` charts all of them.
+
+    Examples
+    --------
+    >>> parts = [au.PartialCounts.from_data(chunk, sets) for chunk in chunks]
+    >>> payload = parts[0].to_bytes()  # shipped between processes
+    >>> total = au.PartialCounts.from_bytes(payload) + sum(parts[1:])
+    >>> chart = total.to_chart(title="All chunks")
+    """
+
+    def __init__(self, table):
+        metadata = (table.schema.metadata or {}).get(METADATA_KEY)
+        if metadata is None:
+            raise ValueError("table does not hold altair-upset partial counts")
+        metadata = json.loads(metadata)
+        if metadata["version"] > FORMAT_VERSION:
+            raise ValueError(
+                f"partial counts use format version {metadata['version']}; this "
+                f"version of altair-upset reads up to {FORMAT_VERSION}"
+            )
+        self._table = table
+        self.sets = metadata["sets"]
+        self.abbre = metadata["abbre"]
+        self.aggregates = metadata["aggregates"] or None
+        self.group_by = metadata["group_by"]
+
+    @classmethod
+    def from_data(cls, data, sets, abbre=None, aggregates=None, group_by=None):
+        """Counts the intersections of ``data``.
+
+        ``data`` is a DataFrame or any other input of ``UpSetAltair``; the
+        other arguments are as for ``UpSetAltair``.
+        """
+        columns = source_columns(data)
+        if not all(s in columns for s in sets):
+            raise ValueError("all sets must be columns in data")
+        if abbre is not None and len(abbre) != len(sets):
+            raise ValueError("abbre must have the same length as sets")
+        partial = source_partial_counts(data, sets, aggregates, group_by)
+        metadata = {
+            "version": FORMAT_VERSION,
+            "sets": list(sets),
+            "abbre": list(abbre if abbre is not None else sets),
+            "aggregates": dict(aggregates or {}),
+            "group_by": group_by,
+        }
+        return cls(_encode(partial, metadata))
+
+    @classmethod
+    def from_arrow(cls, table):
+        """Wraps a ``pyarrow.Table`` returned by ``to_arrow``."""
+        return cls(table)
+
+    @classmethod
+    def from_bytes(cls, payload):
+        """Reads the bytes returned by ``to_bytes``."""
+        import pyarrow as pa
+
+        return cls(pa.ipc.open_stream(pa.py_buffer(payload)).read_all())
+
+    def to_arrow(self):
+        """The counts as a ``pyarrow.Table``, metadata included."""
+        return self._table
+
+    def to_bytes(self):
+        """Serializes the counts as an Arrow IPC stream.
+
+        The stream is zstd-compressed when pyarrow supports it.
+        """
+        import pyarrow as pa
+
+        compression = "zstd" if pa.Codec.is_available("zstd") else None
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, self._table.schema, options=options) as writer:
+            writer.write_table(self._table)
+        return sink.getvalue().to_pybytes()
+
+    def __len__(self):
+        return self._table.num_rows
+
+    def __eq__(self, other):
+        if not isinstance(other, PartialCounts):
+            return NotImplemented
+        return self._table.equals(other._table, check_metadata=True)
+
+    def merge(self, other):
+        """Combines the counts of two disjoint parts of the data."""
+        if not isinstance(other, PartialCounts):
+            raise TypeError("only PartialCounts can be merged")
+        mine = (self.sets, self.aggregates, self.group_by)
+        if mine != (other.sets, other.aggregates, other.group_by):
+            raise ValueError(
+                "partial counts must have the same sets, aggregates and group_by"
+            )
+        merged = merge_partial_counts(
+            [self._decode(), other._decode()], self.sets, self.aggregates, self.group_by
+        )
+        return PartialCounts(_encode(merged, self._metadata()))
+
+    def __add__(self, other):
+        return self.merge(other)
+
+    def __radd__(self, other):
+        # Lets sum() start from 0
+        if isinstance(other, int) and other == 0:
+            return self
+        return NotImplemented
+
+    @property
+    def columns(self):
+        """The counted set, group and aggregate columns."""
+        keys = [self.group_by] if self.group_by is not None else []
+        return keys + self.sets + list(self.aggregates or {})
+
+    def partial_counts(self, sets, aggregates=None, group_by=None):
+        """Decodes the counts, merged down to ``sets`` and ``group_by``."""
+        if group_by is not None and group_by != self.group_by:
+            raise ValueError(f"intersections were not counted by group '{group_by}'")
+        missing = set(partial_fields(aggregates)) - set(self._table.column_names)
+        if missing:
+            raise ValueError(
+                f"aggregates were not counted: {', '.join(sorted(missing))}"
+            )
+        partial = self._decode()
+        if list(sets) == self.sets and group_by == self.group_by:
+            return partial
+        return merge_partial_counts([partial], sets, aggregates, group_by)
+
+    def to_chart(self, **kwargs):
+        """Builds an ``UpSetAltair`` chart of all counted sets, or of ``sets``.
+
+        The abbreviations, aggregates and group the counts were made with are
+        used unless given in ``kwargs``, which are passed on to ``UpSetAltair``.
+        """
+        from .upset import UpSetAltair
+
+        sets = kwargs.pop("sets", self.sets)
+        set_to_abbre = dict(zip(self.sets, self.abbre))
+        options = {
+            "abbre": [set_to_abbre.get(s, s) for s in sets],
+            "aggregates": self.aggregates,
+            "group_by": self.group_by,
+        }
+        options.update(kwargs)
+        return UpSetAltair(self, sets, **options)
+
+    def _metadata(self):
+        return json.loads(self._table.schema.metadata[METADATA_KEY])
+
+    def _decode(self):
+        """The counts as a partial table with one 0/1 column per set."""
+        partial = self._table.to_pandas()
+        codes = partial.pop("code").to_numpy(dtype=np.uint64)
+        n_sets = len(self.sets)
+        for i, s in enumerate(self.sets):
+            bit = np.uint64(n_sets - 1 - i)
+            partial[s] = ((codes >> bit) & np.uint64(1)).astype(np.int64)
+        return partial
+
+
+def _encode(partial, metadata):
+    """Stores a partial table as codes, counts and partials with metadata."""
+    import pyarrow as pa
+
+    group_by = metadata["group_by"]
+    keys = [group_by] if group_by is not None else []
+    parts = list(partial_fields(metadata["aggregates"]))
+    frame = partial[keys].assign(code=membership_codes(partial, metadata["sets"]))
+    frame = pd.concat([frame, partial[["count"] + parts]], axis=1)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    return table.replace_schema_metadata({METADATA_KEY: json.dumps(metadata)})
+
+
+def save_intersections(data, path, sets, abbre=None, aggregates=None, group_by=None):
+    """Counts the intersections of ``data`` and saves them to ``path``.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame, PartialCounts or any input of ``UpSetAltair``
+        The elements to count, or counts to save as they are.
+    path : str or path-like
+        The Arrow IPC file to write.
+    sets : list of str
+        The set columns. Charts of the saved file may use any subset of them.
+    abbre : list of str, optional
+        Abbreviations of the sets, saved for ``IntersectionStore.to_chart``.
+    aggregates : dict, optional
+        As for ``UpSetAltair``. Only mergeable operations (sum, count, min,
+        max, mean) can be saved, since their partial results are stored.
+    group_by : str, optional
+        As for ``UpSetAltair``.
+    """
+    import pyarrow as pa
+
+    counts = PartialCounts.from_data(data, sets, abbre, aggregates, group_by)
+    table = counts.to_arrow()
+    with pa.OSFile(os.fspath(path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+class IntersectionStore(PartialCounts):
+    """Intersections saved by ``save_intersections``, read memory-mapped.
+
+    Pass it as ``data`` to ``UpSetAltair`` or ``preprocess_data`` with any
+    subset of the saved sets, or call ``to_chart``. Counts of a subset of the
+    sets, or without the saved ``group_by``, are merged from the saved rows.
+
+    Parameters
+    ----------
+    path : str or path-like
+        A file written by ``save_intersections``.
+
+    Examples
+    --------
+    >>> au.save_intersections(df, "counts.arrow", sets=["a", "b", "c"])
+    >>> chart = au.IntersectionStore("counts.arrow").to_chart(title="Cached")
+    """
+
+    def __init__(self, path):
+        import pyarrow as pa
+
+        self.path = path
+        table = pa.ipc.open_file(pa.memory_map(os.fspath(path))).read_all()
+        if METADATA_KEY not in (table.schema.metadata or {}):
+            raise ValueError(f"{path} was not written by save_intersections")
+        super().__init__(table)
@@ -1,35 +1,102 @@
+from io import StringIO
+
 import altair as alt
+import pandas as pd
 
+DATA_ENCODINGS = ("rows", "csv")
 
-def create_base_chart(data, sets, legend_selection, set_to_abbre, set_to_order):
-    """Creates the base Altair chart with all transformations."""
-    degree_calculation = "+".join(
-        [f"(isDefined(datum['{s}']) ? datum['{s}'] : 0)" for s in sets]
-    )
 
+def encode_inline_data(data, data_encoding="rows"):
+    """Returns the data to embed in the spec for ``data_encoding``.
+
+    ``"rows"`` embeds the DataFrame as Altair does, one JSON object per row
+    with every column name repeated. ``"csv"`` embeds a single CSV string
+    with the column names once and an explicit ``parse`` type per column, so
+    Vega reads the same values from far fewer bytes. Booleans are written as
+    0/1 since Vega only parses lowercase ``true``/``false``.
+    """
+    if data_encoding == "rows":
+        return data
+    parse = {}
+    for column, dtype in data.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            parse[column] = "boolean"
+        elif pd.api.types.is_numeric_dtype(dtype):
+            parse[column] = "number"
+        else:
+            parse[column] = "string"
+    booleans = [c for c, kind in parse.items() if kind == "boolean"]
+    values = data.astype({c: "int8" for c in booleans}).to_csv(index=False)
+    return alt.InlineData(values=values, format=alt.DataFormat(type="csv", parse=parse))
+
+
+def decode_inline_data(inline):
+    """Reads back a DataFrame embedded by ``encode_inline_data`` as CSV."""
+    parse = inline.format.parse
+    strings = {c: str for c, kind in parse.items() if kind == "string"}
+    data = pd.read_csv(StringIO(inline.values), dtype=strings)
+    booleans = {c: bool for c, kind in parse.items() if kind == "boolean"}
+    return data.astype(booleans)
+
+
+def create_base_chart(data, legend_selection):
+    """Creates the base Altair chart.
+
+    Counts, degrees, set sizes, ranks and the per-set abbreviations and order
+    are precomputed by ``preprocess_data``, so the chart only applies the
+    legend filter; it does not join, aggregate or sort in Vega.
+    """
+    return alt.Chart(data).transform_filter(legend_selection)
+
+
+def create_intersection_chart(data):
+    """Creates a chart of one row per intersection (and group).
+
+    Every set has a row for each intersection, so keeping the first set's rows
+    leaves exactly one. Intersection bars read these rows without aggregating
+    and without the legend filter, so legend toggles never recompute them.
+    """
+    return alt.Chart(data).transform_filter(alt.datum["set_order"] == 1)
+
+
+def create_recomputed_chart(
+    data, sets, legend_selection, set_to_abbre, set_to_order, sort_by, sort_order
+):
+    """Creates a base chart that re-aggregates the intersections in Vega.
+
+    Toggling a set off in the legend merges the intersections that differ only
+    in that set, and degrees, ranks and set sizes are recomputed over the
+    remaining sets. Unlike ``create_base_chart``, every toggle re-runs the
+    pivot, aggregate, window and fold transforms. Before any toggle the rows
+    match those of ``preprocess_data``, ties broken by membership code.
+    """
+    n_sets = len(sets)
+    present = [f"(isDefined(datum['{s}']) ? datum['{s}'] : 0)" for s in sets]
+    code = "+".join(f"{p} * {2 ** (n_sets - 1 - i)}" for i, p in enumerate(present))
+    primary, secondary = (
+        ("count", "degree") if sort_by == "frequency" else ("degree", "count")
+    )
+    order = "ascending" if sort_order == "ascending" else "descending"
     return (
         alt.Chart(data)
         .transform_filter(legend_selection)
         .transform_pivot(
-            "set",
-            op="max",
-            groupby=["intersection_id", "count"],
-            value="is_intersect",
+            "set", op="max", groupby=["intersection_id", "count"], value="is_intersect"
         )
-        .transform_aggregate(
-            count="sum(count)",
-            groupby=sets,
-        )
-        .transform_calculate(degree=degree_calculation)
+        .transform_aggregate(count="sum(count)", groupby=sets)
+        .transform_calculate(degree="+".join(present), intersection_id=code)
         .transform_filter(alt.datum["degree"] != 0)
         .transform_window(
-            intersection_id="row_number()",
+            rank="row_number()",
             frame=[None, None],
+            sort=[
+                {"field": primary, "order": order},
+                {"field": secondary, "order": order},
+                {"field": "intersection_id"},
+            ],
         )
-        .transform_fold(
-            sets,
-            as_=["set", "is_intersect"],
-        )
+        .transform_calculate(rank="datum.rank - 1")
+        .transform_fold(sets, as_=["set", "is_intersect"])
         .transform_lookup(
             lookup="set",
             from_=alt.LookupData(set_to_abbre, "set", ["set_abbre"]),
@@ -44,4 +111,6 @@ def create_base_chart(data, sets, legend_selection, set_to_abbre, set_to_order):
             frame=[None, 0],
             sort=[{"field": "set_order"}],
         )
+        .transform_calculate(member="datum.count * datum.is_intersect")
+        .transform_joinaggregate(set_size="sum(member)", groupby=["set"])
     )
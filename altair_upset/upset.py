@@ -1,36 +1,171 @@
-from typing import List, Optional, Union
+from typing import Callable, Dict, List, Optional, Union
 
 import altair as alt
+import numpy as np
 import pandas as pd
 
-from .components import create_horizontal_bar, create_matrix_view, create_vertical_bar
-from .config import upsetaltair_top_level_configuration
-from .preprocessing import preprocess_data
-from .transforms import create_base_chart
+from .aio import run_in_executor
+from .components import (
+    create_error_bars,
+    create_horizontal_bar,
+    create_lean_matrix_view,
+    create_matrix_view,
+    create_vertical_bar,
+)
+from .config import apply_theme, upsetaltair_top_level_configuration
+from .engines import ENGINES
+from .members import MemberIndex, intersection_code, member_samples
+from .preprocessing import (
+    SAMPLE_SIZE,
+    aggregate_fields,
+    compact_dtypes,
+    degree_combinations,
+    preprocess_data,
+    sample_size_for_error,
+)
+from .sources import source_columns
+from .transforms import (
+    DATA_ENCODINGS,
+    create_base_chart,
+    create_intersection_chart,
+    create_recomputed_chart,
+    decode_inline_data,
+    encode_inline_data,
+)
 
 
 class UpSetChart:
     """A wrapper class for UpSet plots."""
 
-    def __init__(self, chart, data, sets):
+    def __init__(
+        self,
+        chart,
+        data,
+        sets,
+        member_index=None,
+        mode="exclusive",
+        intersection_index=None,
+    ):
         """Initialize the UpSetChart.
 
         Parameters
         ----------
         chart : alt.Chart
             The base Altair chart
-        data : pd.DataFrame
-            The input data
+        data : pd.DataFrame or None
+            The input data. If None, ``data`` is read from the chart itself.
         sets : list
             List of set names
+        member_index : MemberIndex, optional
+            Index of the source rows, used by ``members``.
+        mode : str, default "exclusive"
+            The counting mode of the chart, used by ``members``.
+        intersection_index : IntersectionIndex, optional
+            Exclusive counts of the intersections, used by ``query``.
         """
         self.chart = chart
         self.data = data
         self.sets = sets
+        self.member_index = member_index
+        self.mode = mode
+        self.intersection_index = intersection_index
+
+    @property
+    def data(self):
+        """The preprocessed long table the chart is drawn from.
+
+        Unless a frame was passed explicitly, the wrapper does not hold its own
+        reference: the frame embedded in the chart is returned, or rebuilt from
+        the spec's inline dataset when the chart no longer holds a DataFrame.
+        Assign ``None`` to drop an explicitly passed frame.
+        """
+        if self._data is not None:
+            return self._data
+        frame = _chart_frame(self.chart)
+        if isinstance(frame, alt.InlineData):
+            return compact_dtypes(decode_inline_data(frame), self.sets)
+        if frame is not None:
+            return frame
+        datasets = self.chart.to_dict().get("datasets", {})
+        for values in datasets.values():
+            if values and "intersection_id" in values[0]:
+                return compact_dtypes(pd.DataFrame(values), self.sets)
+        return None
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    def members(self, intersection):
+        """Row positions in the source data of the elements of an intersection.
+
+        Parameters
+        ----------
+        intersection : int or list of str
+            An ``intersection_id`` of ``data``, or the names of the sets the
+            intersection consists of.
+
+        Returns
+        -------
+        numpy.ndarray
+            Positions for ``source.iloc``: the elements counted in the
+            intersection's bar under the chart's ``mode``. The lookup reads
+            only the index, never the source data.
+        """
+        if self.member_index is None:
+            raise ValueError("build the chart with index_members=True")
+        if isinstance(intersection, (int, np.integer)):
+            code = self.member_index.codes[intersection]
+        else:
+            code = intersection_code(self.sets, intersection)
+        return self.member_index.rows(code, self.mode)
+
+    def query(self, include=(), exclude=()):
+        """Counts the elements in all sets of ``include`` and none of ``exclude``.
+
+        Elements may be in any other sets too. The answer is computed from the
+        exclusive counts of the intersections with bitmask tests over their
+        membership codes, whatever the chart's ``mode``, and never reads the
+        source data. Intersections left out by ``max_intersections`` are
+        counted too; with ``approximate`` the counts are estimates.
+
+        Parameters
+        ----------
+        include : list of str
+            Sets the elements must belong to.
+        exclude : list of str
+            Sets the elements must not belong to.
+
+        Returns
+        -------
+        dict
+            ``count``, the number of matching elements (a Series indexed by
+            group for charts with ``group_by``), and ``intersections``, a
+            DataFrame with the ``intersection_id``, ``sets``, ``degree`` and
+            exclusive ``count`` of each matching intersection, largest first.
+
+        Examples
+        --------
+        >>> chart.query(include=["A", "B"], exclude=["C"])["count"]
+        """
+        if self.intersection_index is None:
+            raise ValueError("this chart has no intersection index")
+        return self.intersection_index.query(include, exclude)
 
-    def save(self, filename):
-        """Save the chart to a file."""
-        self.chart.save(filename)
+    def save(self, filename, **kwargs):
+        """Save the chart to a file.
+
+        Keyword arguments are passed to ``alt.Chart.save``.
+        """
+        self.chart.save(filename, **kwargs)
+
+    async def save_async(self, filename, **kwargs):
+        """Save the chart to a file without blocking the event loop.
+
+        Serialization and rendering run in the bounded pool of
+        ``altair_upset.aio``; see ``save`` for the arguments.
+        """
+        await run_in_executor(self.save, filename, **kwargs)
 
     def properties(self, **kwargs):
         """Update chart properties."""
@@ -59,9 +194,30 @@ class UpSetChart:
 
     def __getattr__(self, name):
         """Delegate unknown attributes to the underlying chart."""
+        # Private names and a missing chart (while copying or unpickling) are
+        # not delegated, which would recurse through ``data`` and ``chart``
+        if name.startswith("_") or "chart" not in self.__dict__:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
         return getattr(self.chart, name)
 
 
+def _chart_frame(chart):
+    """Returns the first DataFrame or inline CSV data in a (compound) chart."""
+    data = getattr(chart, "data", None)
+    if isinstance(data, pd.DataFrame):
+        return data
+    if isinstance(data, alt.InlineData) and isinstance(data.values, str):
+        return data
+    for attr in ("layer", "vconcat", "hconcat", "concat"):
+        for child in getattr(chart, attr, None) or []:
+            frame = _chart_frame(child)
+            if frame is not None:
+                return frame
+    return None
+
+
 def UpSetAltair(
     data: pd.DataFrame,
     sets: List[str],
@@ -90,30 +246,61 @@ def UpSetAltair(
     horizontal_bar_size: int = 20,
     vertical_bar_label_size: int = 16,
     vertical_bar_padding: int = 20,
-    theme: Optional[str] = None,
+    theme: Optional[Union[str, Dict, Callable]] = None,
+    aggregates: Optional[Dict[str, str]] = None,
+    mode: str = "exclusive",
+    group_by: Optional[str] = None,
+    lean_matrix: bool = False,
+    renderer: Optional[str] = None,
+    page_size: Optional[int] = None,
+    max_bar_labels: int = 100,
+    max_intersections: Optional[int] = None,
+    approximate: bool = False,
+    sample_size: Optional[int] = None,
+    max_error: Optional[float] = None,
+    confidence: float = 0.95,
+    random_state: Optional[int] = None,
+    index_members: bool = False,
+    member_ids: Optional[str] = None,
+    data_encoding: str = "rows",
+    include_empty: bool = False,
+    max_degree: Optional[int] = None,
+    engine: str = "auto",
+    legend_recompute: bool = False,
 ) -> UpSetChart:
     """Generate interactive UpSet plots using Altair. [Lex et al., 2014]_
 
-    UpSet plots are used to visualize set intersections in a more scalable way than Venn diagrams.
-    This implementation provides interactive features like hover highlighting and legend filtering.
+    UpSet plots are used to visualize set intersections in a more scalable way
+    than Venn diagrams. This implementation provides interactive features like
+    hover highlighting and legend filtering.
 
     Parameters
     ----------
-    data : pandas.DataFrame
-        Input data where each column represents a set and contains binary values (0 or 1).
-        Each row represents an element, and the columns indicate set membership.
+    data : pandas.DataFrame, dask.dataframe.DataFrame or path
+        Input data where each column represents a set and contains binary
+        values (0 or 1). Each row represents an element, and the columns
+        indicate set membership.
+        Dask DataFrames are counted partition by partition on the current Dask
+        scheduler; only the aggregated intersection table is collected.
+        A path to a Parquet file, Arrow IPC file (``.arrow``/``.feather``), CSV
+        file or Parquet dataset directory is streamed in record batches,
+        reading only the columns the plot needs; wrap it in a ``FileSource``
+        to choose the batch size.
     sets : list of str
         Names of the sets to visualize (must correspond to column names in data).
     title : str, default ""
         Title of the plot.
     subtitle : str or list of str, default ""
-        Subtitle(s) of the plot. Can be a single string or list of strings for multiple lines.
+        Subtitle(s) of the plot. Can be a single string or list of strings
+        for multiple lines.
     abbre : list of str, optional
         Abbreviations for set names (must have same length as sets).
     sort_by : {"frequency", "degree"}, default "frequency"
         Method to sort the intersections:
         - "frequency": sort by intersection size
         - "degree": sort by number of sets in intersection
+        Ties are broken by the other key and then by set membership, so the
+        order is deterministic.
     sort_order : {"ascending", "descending"}, default "ascending"
         Order of sorting for intersections.
     width : int, default 1200
@@ -139,9 +326,102 @@ def UpSetAltair(
     vertical_bar_label_size : int, default 16
         Font size of vertical bar labels.
     vertical_bar_padding : int, default 20
-        Padding between vertical bars.
-    theme : str, optional
-        Altair theme to use. If None, uses the current default theme.
+        Padding between vertical bars. When paging, or when it is at least
+        the width available per bar, it is capped at half of each bar's step.
+    theme : str, dict or callable, optional
+        Altair theme to style this chart with: the name of a registered theme,
+        or theme properties (or a function returning them) as registered with
+        ``alt.theme.register``. The theme is merged into the chart's own
+        config, without enabling it globally, so charts with different themes
+        can be built concurrently. If None, uses the current default theme.
+    aggregates : dict of str to str, optional
+        Per-intersection statistics of other columns, mapping a column of ``data``
+        to a pandas aggregation such as ``"mean"`` or ``"median"``. They are
+        computed in the same grouping pass as the counts, stored as
+        ``"{column}_{op}"`` fields and shown in the tooltips.
+    mode : {"exclusive", "inclusive", "union"}, default "exclusive"
+        Which elements an intersection counts:
+        - "exclusive": elements in exactly these sets
+        - "inclusive": elements in at least these sets
+        - "union": elements in any of these sets
+        Inclusive and union counts are derived from the exclusive counts with a
+        subset-sum transform over the membership codes.
+    group_by : str, optional
+        Column of ``data`` to split the plot into small multiples, one per value.
+        All groups are counted in a single pass and read one shared dataset; the
+        panels share their axes, intersection order and selections. ``width`` and
+        ``height`` apply to each panel.
+    lean_matrix : bool, default False
+        Draw the matrix with the fewest marks: one circle per cell colored by
+        membership, one connecting line per intersection and one background
+        stripe per odd set row, instead of separate background, stripe and
+        highlight layers per cell. Looks the same, and redraws much faster for
+        large matrices.
+    renderer : {"canvas", "svg"}, optional
+        Renderer requested from vega-embed through the spec's ``usermeta``.
+        Canvas is cheaper to redraw for charts with many marks.
+    page_size : int, optional
+        Show at most this many intersections at a time. Larger charts get a
+        slider to page through the intersections in rank order, so bars keep a
+        usable width however many intersections there are. The embedded table
+        has one row per intersection and set, so large charts usually also need
+        ``alt.data_transformers.disable_max_rows()``.
+    max_bar_labels : int, default 100
+        Label at most this many of the visible bars; beyond it only every n-th
+        bar gets a count label.
+    max_intersections : int, optional
+        Plot only this many of the largest intersections. Set sizes still
+        count every element.
+    approximate : bool, default False
+        Count a random sample of the rows (stratified by ``group_by``) and
+        scale the counts up. Bars get error bars for the ``confidence``
+        interval of each count, and intersections seen fewer than 10 times in
+        the sample are faded as unreliable. Needs a pandas or Dask DataFrame
+        and no ``aggregates``.
+    sample_size : int, optional
+        Rows to sample with ``approximate``. Defaults to 100,000, or to the
+        size that achieves ``max_error``.
+    max_error : float, optional
+        Target margin of error of ``approximate`` counts as a fraction of the
+        total number of rows, e.g. 0.01; sets the sample size.
+    confidence : float, default 0.95
+        Confidence level of the intervals of ``approximate`` counts.
+    random_state : int, optional
+        Seed of the ``approximate`` sample.
+    index_members : bool, default False
+        Index the rows of ``data`` by intersection so that
+        ``UpSetChart.members`` returns the rows of any intersection without
+        rescanning ``data``. Needs a pandas DataFrame.
+    member_ids : str, optional
+        Column of ``data`` identifying the elements. The first few ids of
+        each intersection are shown in its tooltip; implies ``index_members``.
+    data_encoding : {"rows", "csv"}, default "rows"
+        How the data is embedded in the spec. "rows" is Altair's array of
+        JSON objects. "csv" embeds one CSV string with typed columns, which
+        repeats no column names and makes large specs several times smaller
+        and faster to parse; the chart renders the same.
+    include_empty : bool, default False
+        Also plot the combinations of sets that no element belongs to, with a
+        count of zero. Only combinations of up to ``max_degree`` sets are
+        enumerated; at most 100,000 of them (times the number of groups).
+    max_degree : int, optional
+        Highest degree of the zero-count intersections added by
+        ``include_empty``. Defaults to all sets, which is only feasible for up
+        to 16 sets. Observed intersections of higher degree are still plotted.
+    engine : str, default "auto"
+        Backend that counts the intersections of a pandas DataFrame:
+        "pandas", "numpy", "polars" or "numba" (the latter two if installed),
+        or any engine added with ``engines.register_engine``. All return the
+        same counts. "auto" picks the fastest one that supports the options
+        from the number of rows and the installed libraries. Other inputs are
+        counted by their source.
+    legend_recompute : bool, default False
+        Re-aggregate the intersections in Vega when sets are toggled in the
+        legend, merging intersections that differ only in the hidden sets and
+        recomputing degrees, ranks and set sizes. By default a toggle only
+        hides the set's rows, which needs no recomputation. Only supported
+        for exclusive counts without ``group_by``, ``page_size``,
+        ``aggregates``, ``member_ids`` or ``approximate``.
 
     Returns
     -------
@@ -172,18 +452,22 @@ def UpSetAltair(
 
     References
     ----------
-    .. [Lex et al., 2014] Alexander Lex, Nils Gehlenborg, Hendrik Strobelt, Romain Vuillemot, Hanspeter Pfister.
+    .. [Lex et al., 2014] Alexander Lex, Nils Gehlenborg, Hendrik Strobelt,
+                Romain Vuillemot, Hanspeter Pfister.
                 UpSet: Visualization of Intersecting Sets
-                IEEE transactions on visualization and computer graphics, 20(12), 1983-1992.
+                IEEE transactions on visualization and computer graphics,
+                20(12), 1983-1992.
     """
     # Input validation
-    if not isinstance(data, pd.DataFrame):
-        raise TypeError("data must be a pandas DataFrame")
+    columns = source_columns(data)
     if not isinstance(sets, list) or not all(isinstance(s, str) for s in sets):
         raise TypeError("sets must be a list of strings")
-    if not all(s in data.columns for s in sets):
+    if not all(s in columns for s in sets):
         raise ValueError("all sets must be columns in data")
-    if not all(data[s].isin([0, 1]).all() for s in sets):
+    # Other sources are checked on the aggregated table instead of every row
+    if isinstance(data, pd.DataFrame) and not all(
+        data[s].isin([0, 1]).all() for s in sets
+    ):
         raise ValueError("all set columns must contain only 0s and 1s")
     if height_ratio <= 0 or height_ratio >= 1:
         raise ValueError("height_ratio must be between 0 and 1")
@@ -191,17 +475,119 @@ def UpSetAltair(
         raise ValueError("sort_by must be either 'frequency' or 'degree'")
     if sort_order not in ["ascending", "descending"]:
         raise ValueError("sort_order must be either 'ascending' or 'descending'")
+    if mode not in ["exclusive", "inclusive", "union"]:
+        raise ValueError("mode must be one of 'exclusive', 'inclusive' or 'union'")
+    if aggregates is not None and mode != "exclusive":
+        raise ValueError("aggregates are only supported in exclusive mode")
     if abbre is not None and len(sets) != len(abbre):
         raise ValueError("if provided, abbre must have the same length as sets")
-
-    # Apply theme if specified
-    if theme is not None:
-        alt.themes.enable(theme)
+    if group_by is not None and (group_by not in columns or group_by in sets):
+        raise ValueError("group_by must be a non-set column in data")
+    if renderer not in (None, "canvas", "svg"):
+        raise ValueError("renderer must be either 'canvas' or 'svg'")
+    if page_size is not None and page_size < 1:
+        raise ValueError("page_size must be a positive integer")
+    if max_bar_labels < 1:
+        raise ValueError("max_bar_labels must be a positive integer")
+    if max_intersections is not None and max_intersections < 1:
+        raise ValueError("max_intersections must be a positive integer")
+    if approximate:
+        if aggregates is not None:
+            raise ValueError("aggregates are not supported with approximate=True")
+        if sample_size is not None and max_error is not None:
+            raise ValueError("give at most one of sample_size and max_error")
+        if sample_size is not None and sample_size < 1:
+            raise ValueError("sample_size must be a positive integer")
+        if max_error is not None and not 0 < max_error < 1:
+            raise ValueError("max_error must be between 0 and 1")
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+        if max_error is not None:
+            sample_size = sample_size_for_error(max_error, confidence)
+        elif sample_size is None:
+            sample_size = SAMPLE_SIZE
+    else:
+        sample_size = None
+    if data_encoding not in DATA_ENCODINGS:
+        raise ValueError("data_encoding must be either 'rows' or 'csv'")
+    if legend_recompute and (
+        mode != "exclusive"
+        or group_by is not None
+        or page_size is not None
+        or aggregates is not None
+        or member_ids is not None
+        or approximate
+    ):
+        raise ValueError(
+            "legend_recompute needs exclusive counts without group_by, page_size, "
+            "aggregates, member_ids or approximate"
+        )
+    if engine != "auto" and engine not in ENGINES:
+        raise ValueError(f"engine must be 'auto' or one of {', '.join(ENGINES)}")
+    if max_degree is not None:
+        if not include_empty:
+            raise ValueError("max_degree requires include_empty=True")
+        if max_degree < 1:
+            raise ValueError("max_degree must be a positive integer")
+    empty_codes = None
+    if include_empty:
+        # Fails early, before any counting, if there are too many combinations
+        empty_codes = degree_combinations(len(sets), max_degree)
+    if member_ids is not None:
+        if member_ids not in columns:
+            raise ValueError("member_ids must be a column in data")
+        index_members = True
+    if index_members:
+        if not isinstance(data, pd.DataFrame):
+            raise ValueError("index_members needs a pandas DataFrame")
+        if approximate:
+            raise ValueError("index_members is not supported with approximate=True")
+    if aggregates is not None:
+        if not isinstance(aggregates, dict):
+            raise TypeError("aggregates must be a dict mapping columns to operations")
+        if not all(c in columns and c not in sets for c in aggregates):
+            raise ValueError("aggregate columns must be non-set columns in data")
+
+    # Index the source rows before they are aggregated away
+    source = data
+    member_index = None
+    if index_members:
+        member_index = MemberIndex.from_data(data, sets, empty_codes, group_by)
 
     # Preprocess data
-    data, set_to_abbre, set_to_order, abbre = preprocess_data(
-        data, sets, abbre, sort_order
+    data, set_to_abbre, set_to_order, abbre, intersection_index = preprocess_data(
+        data,
+        sets,
+        abbre,
+        sort_order,
+        aggregates,
+        mode,
+        sort_by,
+        group_by,
+        max_intersections,
+        sample_size,
+        confidence,
+        random_state,
+        include_empty,
+        max_degree,
+        return_index=True,
+        engine=engine,
     )
+    fields = aggregate_fields(aggregates)
+
+    if member_ids is not None:
+        groups = source[group_by].to_numpy() if group_by is not None else None
+        samples = member_samples(
+            member_index,
+            data["intersection_id"].unique(),
+            source[member_ids].to_numpy(),
+            mode,
+            groups,
+        )
+        keys = data["intersection_id"]
+        if group_by is not None:
+            keys = pd.Series(list(zip(data[group_by], keys)), index=data.index)
+        data["member_sample"] = keys.map(samples).astype("category")
 
     # Setup selections for interactivity
     legend_selection = alt.selection_point(fields=["set"], bind="legend")
@@ -212,12 +598,19 @@ def UpSetAltair(
     if horizontal_bar_chart_width is None:
         horizontal_bar_chart_width = int(width * 0.15)  # Make it 25% of total width
     vertical_bar_chart_height = height * height_ratio
-    matrix_height = (height - vertical_bar_chart_height) * 0.8  # Reduce height to tighten spacing
+    # Reduce height to tighten spacing
+    matrix_height = (height - vertical_bar_chart_height) * 0.8
     matrix_width = width - horizontal_bar_chart_width
-    vertical_bar_size = min(
-        30,
-        width / len(data["intersection_id"].unique().tolist()) - vertical_bar_padding,
-    )
+    n_intersections = int(data["rank"].max()) + 1 if len(data) else 0
+    paged = page_size is not None and n_intersections > page_size
+    visible = max(1, page_size if paged else n_intersections)
+    step = width / visible
+    vertical_bar_size = min(30, step - vertical_bar_padding)
+    if paged or vertical_bar_size <= 0:
+        # Padding takes at most half of each bar's step on a page, and when it
+        # would leave no room for the bars
+        vertical_bar_size = min(30, max(step / 2, step - vertical_bar_padding))
+    label_step = -(-visible // max_bar_labels)
 
     # Setup styles
     main_color = "#3A3A3A"
@@ -228,80 +621,187 @@ def UpSetAltair(
     horizontal_bar_label_bg_color = (
         "white" if is_show_horizontal_bar_label_bg else "black"
     )
-    x_sort = alt.Sort(
-        field="count" if sort_by == "frequency" else "degree", order=sort_order
-    )
     tooltip = [
-        alt.Tooltip("max(count):Q", title="Cardinality"),
+        alt.Tooltip("count:Q", title="Cardinality"),
         alt.Tooltip("degree:Q", title="Degree"),
         alt.Tooltip("sets:N", title="Sets"),
+    ] + [
+        alt.Tooltip(f"{field}:Q", title=f"{column} ({op})")
+        for field, (column, op) in fields.items()
     ]
-
-    # Create base chart
-    base = create_base_chart(data, sets, legend_selection, set_to_abbre, set_to_order)
-
-    # Create components
-    vertical_bar, vertical_bar_text = create_vertical_bar(
-        base,
-        matrix_width,
-        vertical_bar_chart_height,
-        main_color,
-        vertical_bar_size,
-        brush_color,
-        x_sort,
-        tooltip,
-        vertical_bar_label_size,
-    )
-    vertical_bar_chart = (
-        (vertical_bar + vertical_bar_text)
-        .add_params(color_selection)
-        .properties(width=matrix_width, height=vertical_bar_chart_height)
-    )
-
-    circle_bg, rect_bg, circle, line_connection = create_matrix_view(
-        vertical_bar,
-        matrix_height,
-        glyph_size,
-        x_sort,
-        brush_color,
-        line_connection_size,
-        main_color,
-    )
-    matrix_view = (
-        (circle + rect_bg + circle_bg + line_connection + circle)
-        .add_params(color_selection)
-        .properties(width=matrix_width)
-    )
-
-    horizontal_bar_label_bg, horizontal_bar_label, horizontal_bar = (
-        create_horizontal_bar(
-            base,
-            set_label_bg_size,
+    if approximate:
+        interval = f"{confidence:.0%} interval"
+        tooltip += [
+            alt.Tooltip("count_lower:Q", title=f"{interval} from"),
+            alt.Tooltip("count_upper:Q", title=f"{interval} to"),
+            alt.Tooltip("reliable:N", title="Reliable"),
+        ]
+        # Unreliable estimates are faded
+        bar_opacity = alt.condition(
+            alt.datum["reliable"], alt.value(1), alt.value(0.35)
+        )
+    else:
+        bar_opacity = alt.Undefined
+    if member_ids is not None:
+        tooltip.append(alt.Tooltip("member_sample:N", title="Examples"))
+
+    # Create base charts: the legend filters the final per-set rows, while the
+    # intersection bars read one row per intersection and ignore the legend
+    inline_data = encode_inline_data(data, data_encoding)
+    if legend_recompute:
+        base = create_recomputed_chart(
+            inline_data,
             sets,
-            color_range,
-            is_show_horizontal_bar_label_bg,
-            horizontal_bar_label_bg_color,
-            horizontal_bar_size,
-            horizontal_bar_chart_width,
+            legend_selection,
+            set_to_abbre,
+            set_to_order,
+            sort_by,
+            sort_order,
+        )
+        intersections = base.transform_filter(alt.datum["set_order"] == 1)
+    else:
+        base = create_base_chart(inline_data, legend_selection)
+        intersections = create_intersection_chart(inline_data)
+
+    # Grouped charts get one panel per group, all reading the shared dataset.
+    # Explicit domains keep the panels' axes aligned.
+    groups = data[group_by].unique().tolist() if group_by is not None else []
+    if groups:
+        panel_bases = [
+            (
+                group,
+                base.transform_filter(alt.datum[group_by] == group),
+                intersections.transform_filter(alt.datum[group_by] == group),
+            )
+            for group in groups
+        ]
+        x_scale = alt.Scale(domain=sorted(data["rank"].unique().tolist()))
+        top = data["count_upper" if approximate else "count"].max()
+        y_scale = alt.Scale(domain=[0, int(top)])
+        set_size_scale = alt.Scale(domain=[0, int(data["set_size"].max())])
+    else:
+        panel_bases = [(None, base, intersections)]
+        x_scale = y_scale = set_size_scale = alt.Undefined
+
+    # Large charts show one page of intersections, picked with a slider. The
+    # bars and the matrix filter to the page and share its ranks as x domain.
+    params = [legend_selection]
+    in_page = None
+    if paged:
+        page = alt.param(
+            value=0,
+            bind=alt.binding_range(
+                min=0, max=(n_intersections - 1) // page_size, step=1, name="Page "
+            ),
+        )
+        params.append(page)
+        start = f"{page.name} * {page_size}"
+        in_page = f"datum.rank >= {start} && datum.rank < {start} + {page_size}"
+        last = f"min({n_intersections}, {start} + {page_size})"
+        x_scale = alt.Scale(domain=alt.ExprRef(expr=f"sequence({start}, {last})"))
+
+    panels = []
+    for group, panel_base, panel_intersections in panel_bases:
+        matrix_base = panel_base
+        if in_page is not None:
+            matrix_base = panel_base.transform_filter(in_page)
+            panel_intersections = panel_intersections.transform_filter(in_page)
+
+        # Create components
+        vertical_bar, vertical_bar_text = create_vertical_bar(
+            panel_intersections,
+            matrix_width,
+            vertical_bar_chart_height,
+            main_color,
+            vertical_bar_size,
+            brush_color,
+            tooltip,
+            vertical_bar_label_size,
+            x_scale,
+            y_scale,
+            label_step,
+            bar_opacity,
         )
+        vertical_bar_layers = [vertical_bar, vertical_bar_text]
+        if approximate:
+            error_bars = create_error_bars(
+                panel_intersections, main_color, x_scale, y_scale
+            )
+            vertical_bar_layers.insert(1, error_bars)
+        vertical_bar_chart = (
+            alt.layer(*vertical_bar_layers)
+            .add_params(color_selection)
+            .properties(width=matrix_width, height=vertical_bar_chart_height)
+        )
+
+        if lean_matrix:
+            stripes, cells, line_connection = create_lean_matrix_view(
+                matrix_base,
+                len(sets),
+                glyph_size,
+                brush_color,
+                line_connection_size,
+                main_color,
+                tooltip,
+                x_scale,
+            )
+            matrix_view = (
+                stripes + cells.add_params(color_selection) + line_connection
+            ).properties(width=matrix_width)
+        else:
+            circle_bg, rect_bg, circle, line_connection = create_matrix_view(
+                matrix_base,
+                matrix_height,
+                glyph_size,
+                brush_color,
+                line_connection_size,
+                main_color,
+                tooltip,
+                x_scale,
+            )
+            matrix_view = (
+                (circle + rect_bg + circle_bg + line_connection + circle)
+                .add_params(color_selection)
+                .properties(width=matrix_width)
+            )
+
+        horizontal_bar_label_bg, horizontal_bar_label, horizontal_bar = (
+            create_horizontal_bar(
+                panel_base,
+                set_label_bg_size,
+                sets,
+                color_range,
+                is_show_horizontal_bar_label_bg,
+                horizontal_bar_label_bg_color,
+                horizontal_bar_size,
+                horizontal_bar_chart_width,
+                set_size_scale,
+            )
+        )
+        horizontal_bar_axis = (
+            (horizontal_bar_label_bg + horizontal_bar_label)
+            if is_show_horizontal_bar_label_bg
+            else horizontal_bar_label
+        ).properties(width=horizontal_bar_chart_width)
+
+        # Combine components
+        panel = alt.vconcat(
+            vertical_bar_chart,
+            alt.hconcat(
+                matrix_view,
+                horizontal_bar_axis,
+                horizontal_bar.properties(width=horizontal_bar_chart_width),
+                spacing=0,  # Minimize spacing between components
+            ).resolve_scale(y="shared"),
+            spacing=5,
+        )
+        if group is not None:
+            panel = panel.properties(title=str(group))
+        panels.append(panel)
+
+    upsetaltair = (panels[0] if len(panels) == 1 else alt.hconcat(*panels)).add_params(
+        *params
     )
-    horizontal_bar_axis = (
-        (horizontal_bar_label_bg + horizontal_bar_label)
-        if is_show_horizontal_bar_label_bg
-        else horizontal_bar_label
-    ).properties(width=horizontal_bar_chart_width)
-
-    # Combine components
-    upsetaltair = alt.vconcat(
-        vertical_bar_chart,
-        alt.hconcat(
-            matrix_view,
-            horizontal_bar_axis,
-            horizontal_bar.properties(width=horizontal_bar_chart_width),
-            spacing=0,  # Minimize spacing between components
-        ).resolve_scale(y="shared"),
-        spacing=5,
-    ).add_params(legend_selection)
 
     # Apply configuration
     chart = upsetaltair_top_level_configuration(
@@ -316,5 +816,28 @@ def UpSetAltair(
             "subtitleFontSize": 14,
         }
     )
+    if renderer is not None:
+        chart = chart.properties(usermeta={"embedOptions": {"renderer": renderer}})
+    # The theme is merged into this chart only; the global theme is untouched
+    if theme is not None:
+        chart = apply_theme(chart, theme)
+
+    # The chart holds the only copy of the data; UpSetChart.data reads it back
+    return UpSetChart(chart, None, sets, member_index, mode, intersection_index)
 
-    return UpSetChart(chart, data, sets)
+
+async def UpSetAltair_async(data, sets, **kwargs) -> UpSetChart:
+    """Async counterpart of ``UpSetAltair`` for use in event loops.
+
+    Counting, preprocessing and building the chart run in the bounded pool of
+    ``altair_upset.aio``, so at most ``aio.MAX_WORKERS`` charts (see
+    ``aio.set_max_workers``) are built at once and the loop stays responsive.
+    Cancelling the awaiting task drops the work if it has not started yet.
+    Arguments are the same as for ``UpSetAltair``.
+
+    Examples
+    --------
+    >>> chart = await au.UpSetAltair_async(data, sets=["set1", "set2"])
+    >>> await chart.save_async("chart.png")
+    """
+    return await run_in_executor(UpSetAltair, data, sets, **kwargs)
@@ -0,0 +1,116 @@
+"""Measures how much of the Vega dataflow each interaction re-evaluates.
+
+The UpSet spec is compiled to Vega with vl-convert's headless Vega-Lite
+runtime. For every selection parameter we count the data transforms that
+depend on its store, i.e. the operators Vega re-runs when the user hovers or
+toggles the legend, together with the number of rows flowing into them. The
+headless runtime is also timed rendering the chart at rest and with the first
+set toggled off in the legend. Both timings are full static re-renders of the
+spec, with the legend state baked into its parameter value; they bound, but do
+not measure, the incremental dataflow update of an interaction in a browser.
+
+Usage::
+
+    python benchmarks/interaction_cost.py [--sets 4 6 8] [--rows 100000]
+"""
+
+import argparse
+import copy
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import vl_convert as vlc
+
+import altair_upset as au
+
+
+def compile_to_vega(spec):
+    """Compiles a Vega-Lite spec with the headless runtime."""
+    vega = vlc.vegalite_to_vega(spec)
+    return json.loads(vega) if isinstance(vega, str) else vega
+
+
+def interaction_cost(spec, rows):
+    """Maps each selection parameter to the transforms its updates re-run.
+
+    Returns ``{kind: (transforms, rows_in)}`` with ``kind`` ``"legend"`` for
+    the legend binding and ``"hover"`` otherwise. ``rows_in`` is an upper bound
+    on the rows entering those transforms (``rows`` per dependent data source).
+    """
+    data = compile_to_vega(spec)["data"]
+    children = {}
+    for entry in data:
+        children.setdefault(entry.get("source"), []).append(entry)
+
+    def downstream(entry):
+        yield entry
+        for child in children.get(entry["name"], []):
+            yield from downstream(child)
+
+    costs = {}
+    for param in spec.get("params", []):
+        store = f"{param['name']}_store"
+        dependent = {}
+        for entry in data:
+            if store in json.dumps(entry.get("transform", [])):
+                for node in downstream(entry):
+                    dependent[node["name"]] = node
+        transforms = sum(len(node.get("transform", [])) for node in dependent.values())
+        kind = "legend" if param.get("bind") == "legend" else "hover"
+        costs[kind] = (transforms, rows * len(dependent))
+    return costs
+
+
+def render_seconds(spec, repeat=3):
+    """Best-of-``repeat`` headless render time of ``spec``, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        vlc.vegalite_to_scenegraph(spec)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def legend_toggled(spec, sets, set_name):
+    """Returns ``spec`` with ``set_name`` toggled off in the legend.
+
+    The legend selection holds the sets that are shown, so toggling one off
+    selects all the others.
+    """
+    spec = copy.deepcopy(spec)
+    for param in spec["params"]:
+        if param.get("bind") == "legend":
+            param["value"] = [{"set": s} for s in sets if s != set_name]
+    return spec
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sets", type=int, nargs="+", default=[4, 6, 8])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vlc.vegalite_to_scenegraph({"mark": "point"})  # start the runtime
+    print("# render_s/toggled_s: static re-renders, not interaction updates")
+    print("sets  long_rows  interaction  transforms  rows_in  render_s  toggled_s")
+    for n_sets in args.sets:
+        sets = [f"set{i}" for i in range(n_sets)]
+        frame = pd.DataFrame(rng.integers(0, 2, size=(args.rows, n_sets)), columns=sets)
+        # Leave room for every intersection's bar
+        width = max(1200, 25 * 2**n_sets)
+        spec = au.UpSetAltair(frame, sets, width=width).to_dict()
+        rows = len(next(iter(spec["datasets"].values())))
+        at_rest = render_seconds(spec)
+        toggled = render_seconds(legend_toggled(spec, sets, sets[0]))
+        for kind, (transforms, rows_in) in interaction_cost(spec, rows).items():
+            print(
+                f"{n_sets:4d}  {rows:9d}  {kind:11s}  {transforms:10d}  "
+                f"{rows_in:7d}  {at_rest:8.3f}  {toggled:9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
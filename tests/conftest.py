@@ -2,10 +2,18 @@ import json
 from pathlib import Path
 
 import altair as alt
+import numpy as np
 import pandas as pd
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def reset_altair_counters():
+    """Reset Altair's name counters so generated param/view names are stable"""
+    alt.Parameter._counter = 0
+    alt.Chart._counter = 0
+
+
 @pytest.fixture
 def output_dir():
     """Fixture providing the debug output directory"""
@@ -300,6 +308,23 @@ def sample_data():
     )
 
 
+@pytest.fixture
+def membership_data(request):
+    """Random membership table with a ``score`` attribute and a ``batch`` group.
+
+    Parametrize indirectly with a dict of ``rows``, ``sets``, ``groups`` and
+    ``seed`` to change its shape.
+    """
+    shape = {"rows": 2000, "sets": "abcd", "groups": "xyz", "seed": 7}
+    shape.update(getattr(request, "param", {}))
+    rng = np.random.default_rng(shape["seed"])
+    size = (shape["rows"], len(shape["sets"]))
+    data = pd.DataFrame(rng.integers(0, 2, size=size), columns=list(shape["sets"]))
+    data["score"] = rng.normal(size=len(data))
+    data["batch"] = rng.choice(list(shape["groups"]), size=len(data))
+    return data
+
+
 @pytest.fixture
 def sample_sets():
     """List of set names."""
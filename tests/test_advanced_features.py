@@ -1,5 +1,7 @@
 """Tests for advanced UpSet plot features."""
 
+import json
+
 import pytest
 import pandas as pd
 import numpy as np
@@ -54,7 +56,7 @@ def test_set_size_encoding(basic_chart):
     
     # Check encoding - need to convert to dict to access field values
     encoding_dict = horizontal_bar.encoding.to_dict()
-    assert encoding_dict['x']['field'] == 'count'
+    assert encoding_dict['x']['field'] == 'set_size'
     assert encoding_dict['y']['field'] == 'set_order'
 
 
@@ -66,7 +68,7 @@ def test_intersection_encoding(basic_chart):
     
     # Convert encodings to dict for checking
     encoding_dict = matrix.layer[0].encoding.to_dict()  # Use first layer for matrix encodings
-    assert encoding_dict['x']['field'] == 'intersection_id'
+    assert encoding_dict['x']['field'] == 'rank'
     assert encoding_dict['y']['field'] == 'set_order'
 
 
@@ -95,6 +97,11 @@ def test_hover_interaction(basic_chart):
     assert has_tooltip, "No tooltip found in matrix view"
 
 
+def _intersections_by_rank(chart):
+    """One row per intersection, in display order."""
+    return chart.data.drop_duplicates('intersection_id').sort_values('rank')
+
+
 def test_sort_by_frequency(sample_data):
     """Test sorting intersections by frequency."""
     chart = au.UpSetAltair(
@@ -103,16 +110,14 @@ def test_sort_by_frequency(sample_data):
         sort_by='frequency',
         sort_order='descending'
     )
-    
-    # Get the matrix view component
+
+    # Ordering is precomputed, so the x encoding must not sort in Vega
     matrix_view = chart.chart.vconcat[1].hconcat[0]
-    
-    # Check sort configuration in the first layer
     encoding_dict = matrix_view.layer[0].encoding.to_dict()
-    sort_config = encoding_dict['x'].get('sort', {})
-    
-    assert sort_config.get('field') == 'count'
-    assert sort_config.get('order') == 'descending'
+    assert 'sort' not in encoding_dict['x']
+
+    counts = _intersections_by_rank(chart)['count'].tolist()
+    assert counts == sorted(counts, reverse=True)
 
 
 def test_sort_by_degree(sample_data):
@@ -123,16 +128,14 @@ def test_sort_by_degree(sample_data):
         sort_by='degree',
         sort_order='ascending'
     )
-    
-    # Get the matrix view component
+
     matrix_view = chart.chart.vconcat[1].hconcat[0]
-    
-    # Check sort configuration in the first layer
     encoding_dict = matrix_view.layer[0].encoding.to_dict()
-    sort_config = encoding_dict['x'].get('sort', {})
-    
-    assert sort_config.get('field') == 'degree'
-    assert sort_config.get('order') == 'ascending'
+    assert 'sort' not in encoding_dict['x']
+
+    intersections = _intersections_by_rank(chart)
+    assert intersections['degree'].tolist() == sorted(intersections['degree'])
+    assert intersections['rank'].tolist() == list(range(len(intersections)))
 
 
 def test_custom_colors(sample_data):
@@ -149,3 +152,504 @@ def test_custom_colors(sample_data):
     horizontal_bar = hconcat.hconcat[-1]
     assert 'scale' in str(horizontal_bar.encoding.color)
     assert all(color in str(horizontal_bar.encoding.color) for color in custom_colors)
+
+
+def test_aggregates_tooltip(sample_data):
+    """Test that aggregate fields are attached to the data and tooltips."""
+    sample_data['score'] = np.arange(len(sample_data))
+    chart = au.UpSetAltair(
+        data=sample_data,
+        sets=['A', 'B', 'C'],
+        aggregates={'score': 'mean', 'set_size': 'max'}
+    )
+
+    assert {'score_mean', 'set_size_max'} <= set(chart.data.columns)
+    vertical_bar = chart.chart.vconcat[0].layer[0]
+    tooltip_fields = [t['field'] for t in vertical_bar.encoding.to_dict()['tooltip']]
+    assert 'score_mean' in tooltip_fields
+    assert 'set_size_max' in tooltip_fields
+
+
+def test_aggregates_validation(sample_data):
+    """Test that invalid aggregate columns are rejected."""
+    with pytest.raises(ValueError):
+        au.UpSetAltair(data=sample_data, sets=['A', 'B', 'C'], aggregates={'A': 'mean'})
+    with pytest.raises(ValueError):
+        au.UpSetAltair(
+            data=sample_data, sets=['A', 'B', 'C'], aggregates={'missing': 'mean'}
+        )
+
+
+def test_inclusive_mode(sample_data):
+    """Test that inclusive counts are at least the exclusive counts."""
+    exclusive = au.UpSetAltair(data=sample_data, sets=['A', 'B', 'C'])
+    inclusive = au.UpSetAltair(data=sample_data, sets=['A', 'B', 'C'], mode='inclusive')
+
+    def counts(chart):
+        return chart.data.groupby('intersection_id')['count'].first().sort_index()
+
+    assert (counts(inclusive) >= counts(exclusive)).all()
+    # A single set's inclusive count is its set size
+    singles = inclusive.data[
+        (inclusive.data['degree'] == 1) & (inclusive.data['is_intersect'] == 1)
+    ]
+    for _, row in singles.iterrows():
+        assert row['count'] == sample_data[row['set']].sum()
+
+
+def test_group_by_small_multiples(sample_data):
+    """Test that grouped charts are panels over a single shared dataset."""
+    sample_data['batch'] = np.where(np.arange(len(sample_data)) % 2, 'odd', 'even')
+    chart = au.UpSetAltair(data=sample_data, sets=['A', 'B', 'C'], group_by='batch')
+
+    assert isinstance(chart.chart, alt.HConcatChart)
+    assert len(chart.chart.hconcat) == 2
+    assert [panel.title for panel in chart.chart.hconcat] == ['even', 'odd']
+
+    spec = chart.to_dict()
+    datasets_with_batch = [
+        values for values in spec['datasets'].values() if 'batch' in values[0]
+    ]
+    assert len(datasets_with_batch) == 1
+
+    # Panels share the intersection axis
+    domains = [
+        panel.vconcat[0].layer[0].encoding.x.to_dict()['scale']['domain']
+        for panel in chart.chart.hconcat
+    ]
+    assert domains[0] == domains[1]
+
+
+def test_group_by_validation(sample_data):
+    """Test that group_by must name a non-set column."""
+    with pytest.raises(ValueError):
+        au.UpSetAltair(data=sample_data, sets=['A', 'B', 'C'], group_by='A')
+
+
+def test_chart_data_is_not_duplicated(basic_chart):
+    """Test that UpSetChart.data reads the frame held by the chart."""
+    assert basic_chart.data is basic_chart.chart.data
+    assert isinstance(basic_chart.data['set'].dtype, pd.CategoricalDtype)
+
+    # Charts whose data was inlined rebuild the table from the spec
+    expected = basic_chart.data
+    basic_chart.chart.data = alt.InlineData(values=expected.to_dict('records'))
+    rebuilt = basic_chart.data
+    pd.testing.assert_frame_equal(
+        rebuilt.reset_index(drop=True), expected.reset_index(drop=True)
+    )
+
+
+def test_spec_has_single_dataset(basic_chart):
+    """Test that all views share one named dataset and need no lookups."""
+    spec = basic_chart.to_dict()
+    assert len(spec['datasets']) == 1
+    assert 'lookup' not in json.dumps(spec)
+
+
+def test_interactions_do_not_recompute_intersections(basic_chart):
+    """Test that hover only re-encodes and the legend filters final rows."""
+    vl_convert = pytest.importorskip("vl_convert")
+    spec = basic_chart.to_dict()
+    vega = vl_convert.vegalite_to_vega(spec)
+    vega = json.loads(vega) if isinstance(vega, str) else vega
+    transforms = [t for entry in vega['data'] for t in entry.get('transform', [])]
+
+    hover, legend = (
+        f"{param['name']}_store"
+        for param in sorted(spec['params'], key=lambda p: 'bind' in p)
+    )
+    assert hover not in json.dumps(transforms)
+    assert sum(legend in json.dumps(t) for t in transforms) == 1
+    # Only the set bars and connection lines aggregate, over filtered rows
+    assert sum(t['type'] == 'aggregate' for t in transforms) == 2
+
+
+def test_lean_matrix(sample_data):
+    """Test that the lean matrix draws each cell once over generated stripes."""
+    chart = au.UpSetAltair(
+        data=sample_data, sets=['A', 'B', 'C'], lean_matrix=True, renderer='canvas'
+    )
+    matrix = chart.chart.vconcat[1].hconcat[0]
+    assert [layer.mark.type for layer in matrix.layer] == ['rect', 'circle', 'bar']
+    assert matrix.layer[0].data.to_dict() == {
+        'sequence': {'start': 1, 'stop': 4, 'step': 2, 'as': 'set_order'}
+    }
+
+    spec = chart.to_dict()
+    assert len(spec['datasets']) == 1
+    assert spec['usermeta'] == {'embedOptions': {'renderer': 'canvas'}}
+
+    with pytest.raises(ValueError):
+        au.UpSetAltair(data=sample_data, sets=['A', 'B', 'C'], renderer='webgl')
+
+
+def test_large_chart_paging_and_label_thinning():
+    """Test that many intersections are paged and only some bars are labelled."""
+    rng = np.random.default_rng(0)
+    sets = [f's{i}' for i in range(9)]
+    data = pd.DataFrame(rng.integers(0, 2, size=(5000, 9)), columns=sets)
+
+    chart = au.UpSetAltair(data, sets, page_size=50, max_bar_labels=10)
+    bars, text = chart.chart.vconcat[0].layer
+    # On a page, padding takes at most half of each bar's step
+    assert bars.mark.size == 1200 / 50 / 2
+    # Unpaged bars keep the full padding unless it leaves no room for them
+    unpaged = au.UpSetAltair(data, sets[:3], width=200, vertical_bar_padding=20)
+    assert unpaged.chart.vconcat[0].layer[0].mark.size == 200 / 7 - 20
+    dense = au.UpSetAltair(data, sets[:5], width=200, vertical_bar_padding=20)
+    assert dense.chart.vconcat[0].layer[0].mark.size == 200 / 31 / 2
+
+    (page,) = [p for p in chart.to_dict()['params'] if isinstance(p.get('bind'), dict)]
+    assert page['bind']['max'] == (511 - 1) // 50
+    start = f"{page['name']} * 50"
+    domain = bars.encoding.x.to_dict()['scale']['domain']
+    assert domain == {'expr': f'sequence({start}, min(511, {start} + 50))'}
+    assert any(start in str(t.to_dict()) for t in bars.transform)
+    # 50 visible bars with at most 10 labels: every 5th bar is labelled
+    assert text.transform[-1].to_dict() == {'filter': "((datum['rank'] % 5) === 0)"}
+    # The set labels and set size bars read one row per set, not per page row
+    labels, set_bars = chart.chart.vconcat[1].hconcat[1:]
+    per_set = ['set', 'set_order', 'set_abbre']
+    for layer in [*labels.layer, set_bars]:
+        assert layer.transform[-1].to_dict()['groupby'] == per_set
+
+
+def test_approximate_error_bars():
+    """Test that sampled counts get error bars and fade unreliable bars."""
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame(
+        (rng.random((20000, 4)) < [0.5, 0.3, 0.1, 0.01]).astype(int),
+        columns=['a', 'b', 'c', 'd'],
+    )
+
+    chart = au.UpSetAltair(
+        data, ['a', 'b', 'c', 'd'], approximate=True, sample_size=2000, random_state=0
+    )
+    bars, error_bars, text = chart.chart.vconcat[0].layer
+    assert error_bars.mark.type == 'rule'
+    assert error_bars.encoding.y.shorthand == 'count_lower:Q'
+    assert error_bars.encoding.y2.shorthand == 'count_upper:Q'
+    assert 'reliable' in str(bars.encoding.opacity.to_dict())
+
+    rows = chart.data.drop_duplicates('intersection_id')
+    assert (rows['count_lower'] <= rows['count']).all()
+    assert (rows['count'] <= rows['count_upper']).all()
+    assert not rows['reliable'].all()
+
+    with pytest.raises(ValueError):
+        au.UpSetAltair(data, ['a', 'b'], approximate=True, max_error=2)
+    with pytest.raises(ValueError):
+        au.UpSetAltair(
+            data, ['a', 'b'], approximate=True, sample_size=10, max_error=0.1
+        )
+
+
+@pytest.mark.parametrize('mode', ['exclusive', 'inclusive'])
+def test_members_drill_down(sample_data, mode):
+    """Test that members() returns the rows a bar counts, without rescans."""
+    sets = ['A', 'B', 'C']
+    chart = au.UpSetAltair(sample_data, sets, index_members=True, mode=mode)
+
+    rows = chart.data.drop_duplicates('intersection_id')
+    for _, row in rows.iterrows():
+        members = chart.members(int(row['intersection_id']))
+        assert len(members) == row['count']
+        in_sets = chart.data[
+            (chart.data['intersection_id'] == row['intersection_id'])
+            & (chart.data['is_intersect'] == 1)
+        ]['set'].tolist()
+        selected = sample_data.iloc[members][in_sets]
+        assert (selected == 1).all().all()
+
+    by_name = chart.members(['A', 'B'])
+    expected = sample_data[(sample_data['A'] == 1) & (sample_data['B'] == 1)]
+    if mode == 'exclusive':
+        expected = expected[expected['C'] == 0]
+    assert by_name.tolist() == [sample_data.index.get_loc(i) for i in expected.index]
+
+    with pytest.raises(ValueError):
+        au.UpSetAltair(sample_data, sets).members(0)
+
+
+def test_member_ids_tooltip(sample_data):
+    """Test that a few element ids per intersection are embedded for tooltips."""
+    data = sample_data.assign(name=[f'item{i}' for i in range(len(sample_data))])
+    chart = au.UpSetAltair(data, ['A', 'B', 'C'], member_ids='name')
+
+    rows = chart.data.drop_duplicates('intersection_id')
+    for _, row in rows.iterrows():
+        expected = data['name'].iloc[chart.members(int(row['intersection_id']))]
+        assert row['member_sample'] == ', '.join(expected[:5])
+    assert 'member_sample' in json.dumps(chart.to_dict())
+
+    with pytest.raises(ValueError):
+        au.UpSetAltair(data, ['A', 'B', 'C'], member_ids='missing')
+
+
+def test_members_skip_rows_without_group():
+    """Test that rows left out of the counts are left out of the index too."""
+    data = pd.DataFrame(
+        {
+            'a': [1, 0, 0, 1, 0],
+            'b': [0, 1, 0, 0, 0],
+            'c': [0, 0, 1, 1, 0],
+            'g': ['x', 'y', None, 'x', 'y'],
+            'name': ['p', 'q', 'r', 's', 't'],
+        }
+    )
+    chart = au.UpSetAltair(data, ['a', 'b', 'c'], group_by='g', member_ids='name')
+
+    rows = chart.data.drop_duplicates('intersection_id')
+    expected = {('b',): [1], ('a',): [0], ('a', 'c'): [3]}
+    for _, row in rows.iterrows():
+        in_sets = chart.data[
+            (chart.data['intersection_id'] == row['intersection_id'])
+            & (chart.data['is_intersect'] == 1)
+        ]['set'].tolist()
+        members = chart.members(int(row['intersection_id'])).tolist()
+        assert members == expected[tuple(in_sets)]
+        assert row['member_sample'] == data['name'].iloc[members[0]]
+
+
+def test_themes_are_per_chart_and_thread_safe(sample_data):
+    """Test that concurrent charts keep their own theme and the global one."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def custom(color):
+        return {'config': {'background': color, 'axis': {'labelFontSize': 99}}}
+
+    themes = ['dark', 'quartz', custom('#111111'), custom('#222222'), None]
+    registry = getattr(alt, 'theme', None) or alt.themes
+    active = registry.active
+
+    def build(theme):
+        chart = au.UpSetAltair(sample_data, ['A', 'B', 'C'], theme=theme)
+        return theme, chart.to_dict()
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(build, themes * 8))
+
+    for theme, spec in results:
+        embed = spec.get('usermeta', {}).get('embedOptions', {})
+        if isinstance(theme, str):
+            assert embed['theme'] == theme
+        else:
+            assert 'theme' not in embed
+        if isinstance(theme, dict):
+            assert spec['config']['background'] == theme['config']['background']
+            # The chart's own config wins over the theme's
+            assert spec['config']['axis']['labelFontSize'] == 14
+        else:
+            assert 'background' not in spec['config']
+    assert registry.active == active
+
+    with pytest.raises(ValueError):
+        au.UpSetAltair(sample_data, ['A', 'B', 'C'], theme='no-such-theme')
+
+
+def test_theme_lookup_leaves_other_charts_alone(sample_data, tmp_path):
+    """Test that charts saved while themed charts are built stay unthemed."""
+    import json
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from altair.vegalite.v5.theme import themes
+
+    def slow_theme():
+        # Keeps the theme lookup in progress while the other charts are saved
+        time.sleep(0.05)
+        return {'config': {'background': '#123456'}}
+
+    themes.register('upset-slow-test', slow_theme)
+    plain = au.UpSetAltair(sample_data, ['A', 'B', 'C'])
+    own = alt.Chart(sample_data).mark_point().encode(x='A')
+
+    def build(i):
+        au.UpSetAltair(sample_data, ['A', 'B', 'C'], theme='upset-slow-test')
+
+    def save(i):
+        chart = plain if i % 2 else own
+        path = tmp_path / f'{i}.json'
+        chart.save(str(path), format='json')
+        return json.loads(path.read_text())
+
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            builds = [pool.submit(build, i) for i in range(16)]
+            specs = list(pool.map(save, range(64)))
+        for future in builds:
+            future.result()
+    finally:
+        themes.register('upset-slow-test', None)
+
+    for spec in specs:
+        assert 'theme' not in spec.get('usermeta', {}).get('embedOptions', {})
+        assert 'background' not in spec.get('config', {})
+
+
+@pytest.mark.parametrize('group_by', [None, 'batch'])
+def test_csv_data_encoding_renders_the_same(group_by):
+    """Test that CSV-encoded data is smaller and renders identically."""
+    vlc = pytest.importorskip('vl_convert')
+    import re
+
+    rng = np.random.default_rng(2)
+    sets = ['a', 'b', 'c', 'd']
+    data = pd.DataFrame(rng.integers(0, 2, size=(500, 4)), columns=sets)
+    data['batch'] = rng.choice(['1', '2'], size=len(data))
+
+    rows = au.UpSetAltair(data, sets, group_by=group_by)
+    csv = au.UpSetAltair(data, sets, group_by=group_by, data_encoding='csv')
+
+    (values,) = csv.to_dict()['datasets'].values()
+    (records,) = rows.to_dict()['datasets'].values()
+    assert isinstance(values, str)
+    assert len(json.dumps(values)) < len(json.dumps(records)) / 2
+
+    def svg(chart):
+        # View names come from a global counter, so they differ between charts
+        return re.sub(r'view_\d+', 'view', vlc.vegalite_to_svg(chart.to_dict()))
+
+    assert svg(csv) == svg(rows)
+    pd.testing.assert_frame_equal(
+        csv.data, rows.data.reset_index(drop=True), check_dtype=False
+    )
+    assert au.measure_budget(csv, render=False)['rows'] == len(rows.data)
+
+    with pytest.raises(ValueError):
+        au.UpSetAltair(data, sets, data_encoding='arrow')
+
+
+def test_include_empty_intersections():
+    """Test zero-count intersections in the chart and the member index."""
+    rng = np.random.default_rng(4)
+    sets = ['a', 'b', 'c', 'd']
+    data = pd.DataFrame((rng.random((60, 4)) < 0.1).astype(int), columns=sets)
+
+    chart = au.UpSetAltair(data, sets, include_empty=True, index_members=True)
+    per_id = chart.data.drop_duplicates('intersection_id')
+    assert len(per_id) == 2 ** len(sets) - 1
+    assert (per_id['count'] == 0).any()
+    # Ids of the added intersections still line up with the member index
+    for _, row in per_id.iterrows():
+        assert len(chart.members(int(row['intersection_id']))) == row['count']
+
+    with pytest.raises(ValueError, match='include_empty'):
+        au.UpSetAltair(data, sets, max_degree=2)
+    with pytest.raises(ValueError, match='max_degree'):
+        au.UpSetAltair(data, sets, include_empty=True, max_degree=0)
+
+
+@pytest.mark.parametrize('options', [{}, {'group_by': 'batch'}, {'mode': 'union'}])
+def test_query_matches_boolean_masks(options):
+    """Test set queries against masks over the elements."""
+    rng = np.random.default_rng(6)
+    sets = ['a', 'b', 'c', 'd', 'e']
+    data = pd.DataFrame((rng.random((800, 5)) < 0.3).astype(int), columns=sets)
+    data['batch'] = rng.choice(['x', 'y'], size=len(data))
+    chart = au.UpSetAltair(data, sets, max_intersections=5, **options)
+
+    for _ in range(10):
+        roles = rng.choice(['include', 'exclude', 'any'], size=len(sets))
+        include = [s for s, r in zip(sets, roles) if r == 'include']
+        exclude = [s for s, r in zip(sets, roles) if r == 'exclude']
+        mask = data[include].all(axis=1) & ~data[exclude].any(axis=1)
+
+        result = chart.query(include=include, exclude=exclude)
+        intersections = result['intersections']
+        if 'group_by' in options:
+            expected = mask.groupby(data['batch']).sum()
+            assert result['count'].sort_index().tolist() == expected.tolist()
+        else:
+            assert result['count'] == mask.sum()
+        assert intersections['count'].sum() == mask.sum()
+        for names in intersections['sets']:
+            assert set(include) <= set(names)
+            assert not set(exclude) & set(names)
+
+    with pytest.raises(ValueError):
+        chart.query(include=['a'], exclude=['a'])
+    with pytest.raises(KeyError):
+        chart.query(include=['z'])
+
+
+def test_legend_recompute():
+    """Test that legend toggles can re-aggregate the intersections."""
+    vlc = pytest.importorskip('vl_convert')
+    import re
+
+    rng = np.random.default_rng(2)
+    sets = ['a', 'b', 'c', 'd']
+    data = pd.DataFrame(
+        (rng.random((400, 4)) < [0.5, 0.4, 0.3, 0.2]).astype(int), columns=sets
+    )
+
+    def marks(spec):
+        # Marks are drawn in a different order, so compare them as a multiset
+        svg = re.sub(r'view_\d+', 'view', vlc.vegalite_to_svg(spec))
+        return sorted(svg.replace('><', '>\n<').splitlines())
+
+    default = au.UpSetAltair(data, sets).to_dict()
+    recomputed = au.UpSetAltair(data, sets, legend_recompute=True).to_dict()
+    assert marks(recomputed) == marks(default)
+
+    # Showing only a and b merges the intersections over c and d
+    for param in recomputed['params']:
+        if param.get('bind') == 'legend':
+            param['value'] = [{'set': 'a'}, {'set': 'b'}]
+    svg = vlc.vegalite_to_svg(recomputed)
+    bars = set(
+        re.findall(
+            r'aria-label="rank: (\d+)[^"]*Cardinality: (\d+)[^"]*" '
+            r'role="graphics-symbol" aria-roledescription="bar"',
+            svg,
+        )
+    )
+    expected = data.groupby(['a', 'b']).size().drop((0, 0))
+    assert sorted(int(count) for _, count in bars) == sorted(expected)
+
+    with pytest.raises(ValueError, match='legend_recompute'):
+        au.UpSetAltair(data, sets, legend_recompute=True, mode='inclusive')
+
+
+def test_chart_copy_and_pickle(basic_chart):
+    """Test that copies and unpickled charts don't recurse through __getattr__."""
+    import copy
+    import pickle
+
+    for clone in [
+        copy.copy(basic_chart),
+        copy.deepcopy(basic_chart),
+        pickle.loads(pickle.dumps(basic_chart)),
+    ]:
+        assert clone.sets == basic_chart.sets
+        assert len(clone.data) == len(basic_chart.data)
+        assert clone.to_dict() == basic_chart.to_dict()
+
+    bare = object.__new__(type(basic_chart))
+    with pytest.raises(AttributeError):
+        bare.data
+    with pytest.raises(AttributeError):
+        bare.title
+
+
+@pytest.mark.parametrize('lean_matrix', [False, True])
+def test_hover_highlights_line_connection(sample_data, lean_matrix):
+    """Test that hovering an intersection colors its aggregated matrix line."""
+    vlc = pytest.importorskip('vl_convert')
+    import re
+
+    chart = au.UpSetAltair(sample_data, ['A', 'B', 'C'], lean_matrix=lean_matrix)
+    spec = chart.to_dict()
+    hovered = chart.data[chart.data['degree'] == 3].iloc[0]
+    for param in spec['params']:
+        if param.get('select', {}).get('on') == 'mouseover':
+            param['value'] = [{'intersection_id': int(hovered['intersection_id'])}]
+    lines = re.findall(
+        r'aria-label="rank: (\d+); Min of set_order[^"]*"[^>]* fill="([^"]+)"',
+        vlc.vegalite_to_svg(spec),
+    )
+    colors = {int(rank): fill for rank, fill in lines}
+    assert colors.pop(int(hovered['rank'])) == '#EA4667'
+    assert set(colors.values()) == {'#3A3A3A'}
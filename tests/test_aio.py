@@ -0,0 +1,82 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+import altair_upset as au
+from altair_upset import aio
+
+
+@pytest.fixture
+def single_worker():
+    """Limit the async API to one chart at a time."""
+    aio.set_max_workers(1)
+    yield
+    aio.set_max_workers(aio.MAX_WORKERS)
+
+
+def test_upsetaltair_async(sample_data, sample_sets, tmp_path):
+    """Test that the async API builds and saves the same chart."""
+
+    async def build_and_save():
+        chart = await au.UpSetAltair_async(sample_data, sample_sets, title="Async")
+        await chart.save_async(tmp_path / "chart.json")
+        return chart
+
+    chart = asyncio.run(build_and_save())
+    expected = au.UpSetAltair(sample_data, sample_sets, title="Async")
+    saved = json.loads((tmp_path / "chart.json").read_text())
+    assert saved["datasets"] == expected.to_dict()["datasets"]
+    assert chart.data.equals(expected.data)
+
+
+def test_concurrency_is_bounded(single_worker):
+    """Test that no more than max_workers calls run at the same time."""
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    async def main():
+        await asyncio.gather(*(aio.run_in_executor(work) for _ in range(5)))
+
+    asyncio.run(main())
+    assert peak == 1
+
+
+def test_cancel_queued_work(single_worker):
+    """Test that cancelling a queued call keeps it from running."""
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    async def main():
+        first = asyncio.ensure_future(aio.run_in_executor(blocker))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        queued = asyncio.ensure_future(aio.run_in_executor(calls.append, 1))
+        await asyncio.sleep(0)
+        queued.cancel()
+        # Let the loop forward the cancellation to the pool
+        await asyncio.sleep(0)
+        release.set()
+        await first
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        # The pool is FIFO, so the cancelled call would have run by now
+        await aio.run_in_executor(calls.append, 2)
+
+    asyncio.run(main())
+    assert calls == [2]
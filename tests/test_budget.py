@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import altair_upset as au
+
+
+@pytest.mark.parametrize("lean_matrix", [False, True])
+def test_estimate_matches_measurement(lean_matrix):
+    """Test that the estimate is close to the measured chart."""
+    pytest.importorskip("vl_convert")
+    rng = np.random.default_rng(0)
+    sets = [f"s{i}" for i in range(6)]
+    data = pd.DataFrame(rng.integers(0, 2, size=(2000, 6)), columns=sets)
+    chart = au.UpSetAltair(data, sets, lean_matrix=lean_matrix)
+    n_intersections = chart.data["intersection_id"].nunique()
+
+    estimate = au.estimate_budget(sets, n_intersections, lean_matrix=lean_matrix)
+    actual = au.measure_budget(chart)
+
+    assert estimate["rows"] == actual["rows"] == len(chart.data)
+    assert estimate["spec_bytes"] == pytest.approx(actual["spec_bytes"], rel=0.1)
+    assert estimate["marks"] == pytest.approx(actual["marks"], rel=0.1)
+    assert actual["render_seconds"] > 0
+
+
+def test_estimate_scales_with_options():
+    """Test that paging and the lean matrix reduce the estimated marks."""
+    sets = [f"s{i}" for i in range(12)]
+    full = au.estimate_budget(sets, 4095)
+    lean = au.estimate_budget(sets, 4095, lean_matrix=True)
+    paged = au.estimate_budget(sets, 4095, lean_matrix=True, page_size=100)
+
+    assert full["spec_bytes"] > 1_000_000
+    assert full["marks"] > lean["marks"] > paged["marks"]
+    assert full["render_seconds"] > paged["render_seconds"]
+
+
+def test_measure_without_rendering(sample_data, sample_sets):
+    """Test that measuring without rendering only reports the spec size."""
+    budget = au.measure_budget(au.UpSetAltair(sample_data, sample_sets), render=False)
+    assert budget["spec_bytes"] > 0
+    assert budget["marks"] is None and budget["render_seconds"] is None
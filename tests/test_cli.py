@@ -0,0 +1,72 @@
+import json
+
+import pandas as pd
+import pytest
+
+from altair_upset.cli import main
+
+pytest.importorskip("pyarrow")
+
+
+pytestmark = pytest.mark.parametrize(
+    "membership_data",
+    [pytest.param({"rows": 500, "seed": 3}, id="500x4")],
+    indirect=True,
+)
+
+
+def _chart_rows(path):
+    spec = json.loads(path.read_text())
+    return pd.DataFrame(next(iter(spec["datasets"].values())))
+
+
+def test_cli_csv_and_parquet(membership_data, tmp_path, capsys):
+    """Test that CSV and Parquet inputs give the same chart."""
+    csv_path = tmp_path / "members.csv"
+    parquet_path = tmp_path / "members.parquet"
+    membership_data.to_csv(csv_path, index=False)
+    membership_data.to_parquet(parquet_path)
+
+    for source in [csv_path, parquet_path]:
+        output = tmp_path / f"{source.suffix[1:]}.json"
+        argv = [str(source), "--sets", "a,b,c,d", "--chunk-size", "64"]
+        assert main(argv + ["-o", str(output)]) == 0
+        assert capsys.readouterr().out.strip() == str(output)
+
+    csv_rows = _chart_rows(tmp_path / "csv.json")
+    parquet_rows = _chart_rows(tmp_path / "parquet.json")
+    pd.testing.assert_frame_equal(csv_rows, parquet_rows)
+    assert "score" not in csv_rows.columns
+
+
+def test_cli_many_files_in_parallel(membership_data, tmp_path, capsys):
+    """Test that several inputs are written to the output directory."""
+    inputs = []
+    for i in range(3):
+        path = tmp_path / f"part{i}.parquet"
+        membership_data.sample(frac=0.5, random_state=i).to_parquet(path)
+        inputs.append(str(path))
+    out_dir = tmp_path / "plots"
+
+    argv = inputs + ["--sets", "a,b,c,d", "--format", "html", "--jobs", "2"]
+    assert main(argv + ["--output-dir", str(out_dir)]) == 0
+
+    written = sorted(p.name for p in out_dir.iterdir())
+    assert written == ["part0.html", "part1.html", "part2.html"]
+    assert len(capsys.readouterr().out.split()) == 3
+
+
+def test_cli_max_intersections_and_errors(membership_data, tmp_path, capsys):
+    """Test truncating to the largest intersections and reporting failures."""
+    path = tmp_path / "members.parquet"
+    membership_data.to_parquet(path)
+    output = tmp_path / "top.json"
+
+    argv = [str(path), "--sets", "a,b,c,d", "--max-intersections", "5"]
+    assert main(argv + ["-o", str(output)]) == 0
+    assert _chart_rows(output)["intersection_id"].nunique() == 5
+
+    assert main([str(path), "--sets", "a,missing", "-o", str(output)]) == 1
+    assert "members.parquet" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        main([str(path), str(path), "--sets", "a,b", "-o", str(output)])
@@ -0,0 +1,144 @@
+"""Differential tests of the aggregation engines against the pandas reference."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import altair_upset as au
+from altair_upset.engines import (
+    ENGINES,
+    available_engines,
+    register_engine,
+    select_engine,
+)
+from altair_upset.preprocessing import count_intersections
+
+SET_DTYPES = ["int64", "int32", "bool", "float64"]
+# Narrow integers also check that sums overflowing them come back as int64
+INTEGER_DTYPES = ["int64", "int32", "int16", "int8"]
+FLOAT_DTYPES = ["float64", "float32"]
+INTEGER_OPS = ["sum", "count", "min", "max", "mean", "median"]
+FLOAT_OPS = ["sum", "count", "min", "max", "mean", "std"]
+
+
+def random_case(rng):
+    """Random memberships, groups and aggregates, with missing values."""
+    n_rows = int(rng.integers(0, 2000))
+    n_sets = int(rng.choice([1, 2, 3, 6, 12, 21, 40]))
+    sets = [f"s{i}" for i in range(n_sets)]
+    # Skewed membership probabilities leave some combinations unobserved
+    p = rng.random(n_sets) ** 2
+    data = pd.DataFrame(
+        (rng.random((n_rows, n_sets)) < p).astype(rng.choice(SET_DTYPES)),
+        columns=sets,
+    )
+    data["i"] = rng.integers(-50, 50, size=n_rows).astype(rng.choice(INTEGER_DTYPES))
+    values = rng.normal(size=n_rows)
+    values[rng.random(n_rows) < 0.2] = np.nan
+    data["f"] = values.astype(rng.choice(FLOAT_DTYPES))
+    groups = rng.choice(["b", "a", "c"], size=n_rows).astype(object)
+    groups[rng.random(n_rows) < 0.05] = None
+    data["g"] = groups
+    if rng.random() < 0.3:
+        data["g"] = data["g"].astype("category")
+
+    group_by = "g" if rng.random() < 0.5 else None
+    aggregates = None
+    if rng.random() < 0.6:
+        aggregates = {
+            "i": str(rng.choice(INTEGER_OPS)),
+            "f": str(rng.choice(FLOAT_OPS)),
+        }
+    return data, sets, aggregates, group_by
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_engines_match_pandas(seed):
+    """Fuzz every installed engine against the pandas groupby."""
+    rng = np.random.default_rng(seed)
+    compared = set()
+    for _ in range(40):
+        data, sets, aggregates, group_by = random_case(rng)
+        expected = count_intersections(data, sets, aggregates, group_by)
+        for name in available_engines():
+            engine = ENGINES[name]
+            if not engine.supports(data, sets, aggregates, group_by):
+                continue
+            actual = engine.count(data, sets, aggregates, group_by)
+            # Engines accumulate float32 in 64 bits, pandas in 32 bits
+            atol = 1e-4 if data["f"].dtype == np.float32 else 1e-8
+            pd.testing.assert_frame_equal(
+                actual, expected, atol=atol, obj=f"engine {name}"
+            )
+            compared.add(name)
+    assert {"pandas", "numpy"} <= compared
+
+
+@pytest.mark.parametrize("n_sets", [1, 3, 8, 12])
+def test_numba_engine_matches_pandas(n_sets):
+    """Test the compiled kernel against pandas; the fuzz skips it without numba."""
+    pytest.importorskip("numba")
+    rng = np.random.default_rng(n_sets)
+    sets = [f"s{i}" for i in range(n_sets)]
+    for n_rows, dtype in [
+        (0, "int64"),
+        (1, "bool"),
+        (3000, "int32"),
+        (3000, "float64"),
+    ]:
+        p = rng.random(n_sets) ** 2
+        data = pd.DataFrame(
+            (rng.random((n_rows, n_sets)) < p).astype(dtype), columns=sets
+        )
+        expected = count_intersections(data, sets)
+        actual = ENGINES["numba"].count(data, sets)
+        pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_select_engine():
+    """Test that auto-selection follows size, options and installed libraries."""
+    rng = np.random.default_rng(0)
+    sets = ["a", "b", "c"]
+    data = pd.DataFrame(rng.integers(0, 2, size=(5000, 3)), columns=sets)
+    data["label"] = "x"
+
+    assert select_engine(data.head(10), sets) == "pandas"
+    assert select_engine(data, sets) == "numpy"
+    # Aggregations NumPy does not implement fall back to pandas
+    assert select_engine(data, sets, {"label": "first"}) == "pandas"
+
+
+def test_chart_engines_agree(sample_data, sample_sets):
+    """Test that the engine does not change the chart."""
+
+    def datasets(engine):
+        chart = au.UpSetAltair(sample_data, sample_sets, engine=engine)
+        return chart.to_dict()["datasets"]
+
+    expected = datasets("pandas")
+    for name in available_engines():
+        if ENGINES[name].supports(sample_data, sample_sets):
+            assert datasets(name) == expected
+
+    with pytest.raises(ValueError, match="engine"):
+        au.UpSetAltair(sample_data, sample_sets, engine="spark")
+
+
+def test_register_engine(monkeypatch, sample_data, sample_sets):
+    """Test that registered engines are selectable by name."""
+    calls = []
+
+    def counting(data, sets, aggregates=None, group_by=None):
+        calls.append(len(data))
+        return count_intersections(data, sets, aggregates, group_by)
+
+    monkeypatch.setitem(ENGINES, "custom", ENGINES["pandas"])
+    register_engine("custom", counting)
+    au.UpSetAltair(sample_data, sample_sets, engine="custom")
+    assert calls == [len(sample_data)]
+
+    monkeypatch.setitem(ENGINES, "missing", ENGINES["pandas"])
+    register_engine("missing", counting, requires="not_a_module")
+    assert "missing" not in available_engines()
+    with pytest.raises(ImportError):
+        au.UpSetAltair(sample_data, sample_sets, engine="missing")
@@ -1,6 +1,7 @@
-import pytest
-import pandas as pd
 import numpy as np
+import pandas as pd
+import pytest
+
 from altair_upset.preprocessing import preprocess_data
 
 
@@ -61,3 +62,278 @@ def test_preprocess_data_empty_input():
     assert len(data) == 0
     assert len(set_to_abbre) == len(sets)
     assert len(set_to_order) == len(sets)
+
+
+def test_preprocess_data_aggregates(sample_data, sample_sets):
+    """Test that aggregates are computed per intersection alongside counts."""
+    frame = sample_data.assign(age=[10, 20, 30, 40, 50])
+    data, _, _, _ = preprocess_data(
+        frame, sample_sets, None, "ascending", {"age": "mean"}
+    )
+
+    assert "age_mean" in data.columns
+    expected = frame.groupby(sample_sets)["age"].mean()
+    intersections = data.drop_duplicates("intersection_id")
+    pivot = data.pivot(index="intersection_id", columns="set", values="is_intersect")
+    for _, row in intersections.iterrows():
+        key = tuple(pivot.loc[row["intersection_id"], sample_sets])
+        assert row["age_mean"] == expected.loc[key]
+
+
+def test_preprocess_data_aggregates_empty_input():
+    """Test that aggregate fields exist for empty input."""
+    empty_df = pd.DataFrame(columns=["set1", "set2", "age"])
+    data, _, _, _ = preprocess_data(
+        empty_df, ["set1", "set2"], None, "ascending", {"age": "median"}
+    )
+    assert len(data) == 0
+    assert "age_median" in data.columns
+
+
+def _brute_force_counts(frame, sets, mode):
+    """Count each observed combination by filtering the raw frame."""
+    counts = {}
+    for combo in frame[sets].drop_duplicates().itertuples(index=False):
+        members = [s for s, v in zip(sets, combo) if v == 1]
+        if mode == "exclusive":
+            mask = (frame[sets] == list(combo)).all(axis=1)
+        elif mode == "inclusive":
+            mask = (frame[members] == 1).all(axis=1)
+        else:
+            mask = (frame[members] == 1).any(axis=1)
+        counts[tuple(combo)] = int(mask.sum())
+    return counts
+
+
+@pytest.mark.parametrize("mode", ["exclusive", "inclusive", "union"])
+@pytest.mark.parametrize("dense", [True, False])
+def test_preprocess_data_modes(mode, dense, monkeypatch):
+    """Test mode counts against brute-force filtering of the raw data."""
+    import altair_upset.preprocessing as preprocessing
+
+    if not dense:
+        monkeypatch.setattr(preprocessing, "DENSE_TRANSFORM_MAX_SETS", 0)
+    rng = np.random.default_rng(0)
+    sets = ["a", "b", "c", "d"]
+    frame = pd.DataFrame(rng.integers(0, 2, size=(300, 4)), columns=sets)
+
+    data, _, _, _ = preprocess_data(frame, sets, None, "ascending", mode=mode)
+
+    pivot = data.pivot(index="intersection_id", columns="set", values="is_intersect")
+    counts = data.drop_duplicates("intersection_id").set_index("intersection_id")
+    expected = _brute_force_counts(frame, sets, mode)
+    for intersection_id, row in pivot.iterrows():
+        key = tuple(row[sets])
+        if sum(key) > 0:
+            assert counts.loc[intersection_id, "count"] == expected[key]
+
+    # Set sizes don't depend on the mode
+    set_sizes = data.groupby("set", observed=True)["set_size"].first()
+    assert list(set_sizes[sets]) == list(frame[sets].sum())
+
+
+def test_preprocess_data_invalid_mode(sample_data, sample_sets):
+    """Test that unknown modes and non-exclusive aggregates are rejected."""
+    with pytest.raises(ValueError):
+        preprocess_data(sample_data, sample_sets, None, "ascending", mode="any")
+    with pytest.raises(ValueError):
+        preprocess_data(
+            sample_data.assign(x=1),
+            sample_sets,
+            None,
+            "ascending",
+            {"x": "mean"},
+            mode="inclusive",
+        )
+
+
+def test_preprocess_data_degree_and_rank(sample_data, sample_sets):
+    """Test popcount degrees and deterministic ranks."""
+    data, _, _, _ = preprocess_data(
+        sample_data, sample_sets, None, "descending", sort_by="degree"
+    )
+    intersections = data[data["is_intersect"] == 1].groupby("intersection_id")
+    degrees = data.drop_duplicates("intersection_id").set_index("intersection_id")
+    assert (intersections.size() == degrees["degree"].sort_index()).all()
+
+    # The all-zero combination is not an intersection
+    assert (degrees["degree"] > 0).all()
+
+    ordered = degrees.sort_values("rank")
+    assert ordered["rank"].tolist() == list(range(len(ordered)))
+    assert ordered["degree"].tolist() == sorted(ordered["degree"], reverse=True)
+
+    # Shuffling the input does not change the ranks
+    shuffled, _, _, _ = preprocess_data(
+        sample_data.sample(frac=1, random_state=1),
+        sample_sets,
+        None,
+        "descending",
+        sort_by="degree",
+    )
+    pd.testing.assert_frame_equal(
+        data.reset_index(drop=True), shuffled.reset_index(drop=True)
+    )
+
+
+def test_popcount_and_ranks():
+    """Test the vectorized popcount and lexsort helpers directly."""
+    from altair_upset.preprocessing import intersection_ranks, popcount
+
+    codes = np.array([0b101, 0b1, 0b111, 0b10], dtype=np.uint64)
+    assert popcount(codes).tolist() == [2, 1, 3, 1]
+
+    counts = np.array([5, 5, 1, 5])
+    ranks = intersection_ranks(
+        codes, counts, popcount(codes), "frequency", "descending"
+    )
+    # Ties on count are broken by degree, then by code
+    assert ranks.tolist() == [0, 1, 3, 2]
+
+
+def test_preprocess_data_group_by():
+    """Test that grouped counts match counting each group on its own."""
+    rng = np.random.default_rng(1)
+    sets = ["a", "b", "c"]
+    frame = pd.DataFrame(rng.integers(0, 2, size=(200, 3)), columns=sets)
+    frame["batch"] = rng.choice(["x", "y"], size=200)
+
+    data, _, _, _ = preprocess_data(frame, sets, None, "ascending", group_by="batch")
+
+    # Ids and ranks are shared by all groups
+    per_id = data.groupby("intersection_id")[["rank", "degree"]].nunique()
+    assert (per_id == 1).all().all()
+
+    for batch, group in frame.groupby("batch"):
+        alone, _, _, _ = preprocess_data(group[sets], sets, None, "ascending")
+        grouped = data[data["batch"] == batch]
+        keys = ["intersection_id", "set"]
+        for column in ["count", "set_size"]:
+            expected = alone.groupby(keys, observed=True)[column].first()
+            actual = grouped.groupby(keys, observed=True)[column].first()
+            # Ids are assigned over all groups, so compare by membership instead
+            assert sorted(expected) == sorted(actual)
+        assert len(grouped) == len(alone)
+
+
+def test_preprocess_data_compact_dtypes(sample_data, sample_sets):
+    """Test that the long table uses categoricals and narrow integers."""
+    data, _, _, _ = preprocess_data(sample_data, sample_sets, None, "ascending")
+
+    assert isinstance(data["set"].dtype, pd.CategoricalDtype)
+    assert list(data["set"].cat.categories) == sample_sets
+    assert data["is_intersect"].dtype == np.int8
+    for column in ["intersection_id", "degree", "rank"]:
+        assert data[column].dtype.kind == "i"
+        assert data[column].dtype.itemsize < 8
+    # Counts are summed downstream, so they stay wide enough not to overflow
+    for column in ["count", "set_size"]:
+        assert data[column].dtype == np.int32
+
+
+def test_preprocess_data_max_intersections(sample_data, sample_sets):
+    """Test that only the largest intersections are kept."""
+    full, _, _, _ = preprocess_data(sample_data, sample_sets, None, "descending")
+    top, _, _, _ = preprocess_data(
+        sample_data, sample_sets, None, "descending", max_intersections=2
+    )
+
+    assert top["intersection_id"].nunique() == 2
+    assert sorted(top["rank"].unique()) == [0, 1]
+    largest = full.drop_duplicates("intersection_id")["count"].nlargest(2)
+    assert sorted(top.drop_duplicates("intersection_id")["count"]) == sorted(largest)
+    # Set sizes still count the elements of the dropped intersections
+    assert (
+        top.groupby("set", observed=True)["set_size"].first()
+        == full.groupby("set", observed=True)["set_size"].first()
+    ).all()
+
+
+def test_preprocess_data_sample_estimates():
+    """Test that sampled estimates are scaled up and their intervals cover."""
+    rng = np.random.default_rng(5)
+    sets = ["a", "b", "c"]
+    data = pd.DataFrame(
+        (rng.random((50000, 3)) < [0.6, 0.3, 0.05]).astype(int), columns=sets
+    )
+
+    def by_membership(result):
+        rows = result.pivot_table(
+            index="intersection_id", columns="set", values="is_intersect", observed=True
+        )
+        first = result.drop_duplicates("intersection_id").set_index("intersection_id")
+        return rows.join(first.drop(columns=["set", "is_intersect"])).set_index(sets)
+
+    exact = by_membership(preprocess_data(data, sets, None, "ascending")[0])
+    sampled = by_membership(
+        preprocess_data(
+            data, sets, None, "ascending", sample_size=5000, random_state=0
+        )[0]
+    )
+    true = exact["count"].reindex(sampled.index)
+    assert ((sampled["count_lower"] <= true) & (true <= sampled["count_upper"])).all()
+
+    # A sample of every row gives the exact counts
+    full = by_membership(
+        preprocess_data(data.head(500), sets, None, "ascending", sample_size=1000)[0]
+    )
+    assert (full["count_lower"] == full["count"]).all()
+    assert (full["count_upper"] == full["count"]).all()
+
+
+def test_degree_combinations():
+    """Test that bit enumeration yields each low-degree combination once."""
+    from math import comb
+
+    from altair_upset.preprocessing import degree_combinations, popcount
+
+    assert degree_combinations(3).tolist() == [1, 2, 3, 4, 5, 6, 7]
+
+    codes = degree_combinations(40, 3)
+    assert len(codes) == 40 + comb(40, 2) + comb(40, 3)
+    assert len(np.unique(codes)) == len(codes)
+    assert popcount(codes).max() == 3
+    assert (codes < 2**40).all()
+
+    with pytest.raises(ValueError, match="max_degree"):
+        degree_combinations(40, 6)
+
+
+@pytest.mark.parametrize("group_by", [None, "batch"])
+def test_preprocess_data_include_empty(group_by):
+    """Test that unobserved low-degree combinations are added with zero counts."""
+    from math import comb
+
+    rng = np.random.default_rng(3)
+    sets = ["a", "b", "c", "d", "e"]
+    frame = pd.DataFrame((rng.random((100, 5)) < 0.1).astype(int), columns=sets)
+    frame["batch"] = rng.choice(["x", "y"], size=100)
+
+    observed, _, _, _ = preprocess_data(
+        frame, sets, None, "ascending", group_by=group_by
+    )
+    data, _, _, _ = preprocess_data(
+        frame,
+        sets,
+        None,
+        "ascending",
+        group_by=group_by,
+        include_empty=True,
+        max_degree=2,
+    )
+
+    groups = [None] if group_by is None else ["x", "y"]
+    for group in groups:
+        rows = data if group is None else data[data["batch"] == group]
+        seen = observed if group is None else observed[observed["batch"] == group]
+        per_id = rows.drop_duplicates("intersection_id")
+        seen_ids = seen.drop_duplicates("intersection_id")
+        # Every combination of one or two sets is present, observed or not
+        assert (per_id["degree"] <= 2).sum() == comb(5, 1) + comb(5, 2)
+        assert (per_id["count"] == 0).sum() == len(per_id) - len(seen_ids)
+        # Counts and set sizes of the observed intersections are unchanged
+        assert per_id["count"].sum() == seen_ids["count"].sum()
+        assert (
+            rows.groupby("set", observed=True)["set_size"].first()
+            == seen.groupby("set", observed=True)["set_size"].first()
+        ).all()
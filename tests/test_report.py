@@ -0,0 +1,51 @@
+import json
+import re
+
+import altair_upset as au
+from altair_upset.report import report_html
+
+
+def _payload(document):
+    match = re.search(r'id="upset-report">(.*?)</script>', document, re.S)
+    return json.loads(match.group(1))
+
+
+def test_report_shares_runtime_and_datasets(sample_data, sample_sets, tmp_path):
+    """Test that the runtime and identical data are embedded once."""
+    sets = sample_sets
+    charts = [
+        au.UpSetAltair(sample_data, sets, title="First"),
+        au.UpSetAltair(sample_data, sets, title="Same data", height=500),
+        au.UpSetAltair(sample_data.head(3), sets, title="Other data"),
+    ]
+    path = tmp_path / "report.html"
+    au.save_report(charts, path, title="Report", chart_titles=["a", "b", "<c>"])
+    document = path.read_text()
+
+    for library in ["vega@", "vega-lite@", "vega-embed@"]:
+        assert document.count(f"/{library}") == 1
+    assert document.count('class="upset-chart"') == 3
+    assert "<h2>&lt;c&gt;</h2>" in document
+    assert "IntersectionObserver" in document
+
+    payload = _payload(document)
+    assert len(payload["datasets"]) == 2
+    for chart, entry in zip(charts, payload["charts"]):
+        spec = dict(entry["spec"])
+        spec["datasets"] = {
+            name: payload["datasets"][name] for name in entry["datasets"]
+        }
+        assert spec == chart.to_dict()
+
+    single = tmp_path / "single.html"
+    charts[0].save(str(single))
+    assert len(document) < 3 * len(single.read_text())
+
+
+def test_report_escapes_script_end(sample_data):
+    """Test that data cannot close the embedding script element."""
+    data = sample_data.rename(columns={"set1": "</script>"})
+    chart = au.UpSetAltair(data, ["</script>", "set2", "set3"])
+    document = report_html([chart])
+    assert document.count("</script>") == 5
+    assert _payload(document)["charts"][0]["spec"]
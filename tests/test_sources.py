@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from altair_upset import UpSetAltair
+from altair_upset.preprocessing import count_intersections, preprocess_data
+
+
+@pytest.fixture
+def dask_scheduler():
+    """Run Dask computations on the local threaded scheduler."""
+    dask = pytest.importorskip("dask")
+    with dask.config.set(scheduler="threads"):
+        yield
+
+
+@pytest.mark.usefixtures("dask_scheduler")
+@pytest.mark.parametrize("npartitions", [1, 7, 40])
+def test_dask_counts_match_pandas(membership_data, npartitions):
+    """Test that partitioned counts equal in-memory counts."""
+    dd = pytest.importorskip("dask.dataframe")
+    sets = list("abcd")
+    aggregates = {"score": "mean"}
+    ddf = dd.from_pandas(membership_data, npartitions=npartitions)
+
+    expected = count_intersections(membership_data, sets, aggregates, "batch")
+    actual = count_intersections(ddf, sets, aggregates, "batch")
+
+    pd.testing.assert_frame_equal(
+        actual.drop(columns="score_mean"),
+        expected.drop(columns="score_mean"),
+        check_dtype=False,  # Dask stores strings as pyarrow strings
+    )
+    np.testing.assert_allclose(actual["score_mean"], expected["score_mean"])
+
+
+@pytest.mark.usefixtures("dask_scheduler")
+def test_dask_preprocess_and_chart(membership_data):
+    """Test the full pipeline accepts Dask DataFrames directly."""
+    dd = pytest.importorskip("dask.dataframe")
+    sets = list("abcd")
+    ddf = dd.from_pandas(membership_data, npartitions=5)
+
+    expected, _, _, _ = preprocess_data(membership_data, sets, None, "descending")
+    actual, _, _, _ = preprocess_data(ddf, sets, None, "descending")
+    pd.testing.assert_frame_equal(actual, expected)
+
+    chart = UpSetAltair(ddf, sets)
+    assert chart.to_dict()["vconcat"]
+
+
+@pytest.mark.usefixtures("dask_scheduler")
+def test_dask_rejects_unmergeable_aggregates_and_bad_values(membership_data):
+    """Test errors for aggregates that can't be merged and non-binary sets."""
+    dd = pytest.importorskip("dask.dataframe")
+    ddf = dd.from_pandas(membership_data, npartitions=3)
+    with pytest.raises(ValueError, match="cannot be merged"):
+        count_intersections(ddf, list("abcd"), {"score": "median"})
+
+    bad = dd.from_pandas(membership_data.assign(a=2), npartitions=3)
+    with pytest.raises(ValueError, match="0s and 1s"):
+        count_intersections(bad, list("abcd"))
+
+
+@pytest.mark.usefixtures("dask_scheduler")
+def test_missing_set_values_are_rejected(membership_data, tmp_path):
+    """Test that nulls in set columns raise instead of dropping elements."""
+    pytest.importorskip("pyarrow")
+    dd = pytest.importorskip("dask.dataframe")
+    data = membership_data.head(4).astype({"a": float})
+    data.loc[2, "a"] = np.nan
+    path = tmp_path / "missing.parquet"
+    data.to_parquet(path)
+
+    for source in [path, dd.from_pandas(data, npartitions=2)]:
+        with pytest.raises(ValueError, match="0s and 1s"):
+            count_intersections(source, list("abcd"))
+        with pytest.raises(ValueError, match="0s and 1s"):
+            UpSetAltair(source, list("abcd"))
+
+
+@pytest.fixture
+def parquet_dataset(membership_data, tmp_path):
+    """Write the membership data as a multi-file Parquet dataset."""
+    pytest.importorskip("pyarrow")
+    directory = tmp_path / "dataset"
+    directory.mkdir()
+    for i, start in enumerate(range(0, len(membership_data), 700)):
+        chunk = membership_data.iloc[start : start + 700]
+        chunk.to_parquet(directory / f"part-{i}.parquet", row_group_size=100)
+    return directory
+
+
+@pytest.mark.parametrize("batch_size", [64, 100_000])
+def test_parquet_directory_counts_match_pandas(
+    membership_data, parquet_dataset, batch_size
+):
+    """Test streaming a dataset directory batch by batch."""
+    from altair_upset.sources import count_file_intersections
+
+    sets = list("abcd")
+    aggregates = {"score": "max"}
+    expected = count_intersections(membership_data, sets, aggregates, "batch")
+    actual = count_file_intersections(
+        parquet_dataset, sets, aggregates, "batch", batch_size=batch_size
+    )
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_parquet_reads_only_needed_columns(membership_data, tmp_path, monkeypatch):
+    """Test that unrelated columns are projected away."""
+    pytest.importorskip("pyarrow")
+    from altair_upset import sources
+
+    path = tmp_path / "wide.parquet"
+    membership_data.assign(payload="x" * 100).to_parquet(path)
+
+    requested = []
+    open_dataset = sources._open_dataset
+
+    class Spy:
+        def __init__(self, dataset):
+            self.dataset = dataset
+
+        def to_batches(self, **kwargs):
+            requested.append(kwargs["columns"])
+            return self.dataset.to_batches(**kwargs)
+
+    monkeypatch.setattr(sources, "_open_dataset", lambda s: Spy(open_dataset(s)))
+    sources.count_file_intersections(path, list("abcd"))
+    assert requested == [list("abcd")]
+
+
+def test_file_paths_in_chart(membership_data, tmp_path):
+    """Test that UpSetAltair and preprocess_data accept Parquet and Arrow paths."""
+    pytest.importorskip("pyarrow")
+    sets = list("abcd")
+    parquet_path = tmp_path / "members.parquet"
+    arrow_path = tmp_path / "members.arrow"
+    membership_data.to_parquet(parquet_path)
+    membership_data.to_feather(arrow_path)
+
+    expected, _, _, _ = preprocess_data(membership_data, sets, None, "ascending")
+    for path in [parquet_path, str(arrow_path)]:
+        actual, _, _, _ = preprocess_data(path, sets, None, "ascending")
+        pd.testing.assert_frame_equal(actual, expected)
+
+    chart = UpSetAltair(parquet_path, sets, aggregates={"score": "mean"})
+    assert "score_mean" in chart.data.columns
+    with pytest.raises(ValueError):
+        UpSetAltair(parquet_path, ["a", "missing"])
+    with pytest.raises(TypeError):
+        UpSetAltair([[0, 1]], sets)
+
+
+def test_csv_file_source(membership_data, tmp_path):
+    """Test streaming a CSV file in small batches through FileSource."""
+    pytest.importorskip("pyarrow")
+    from altair_upset import FileSource
+
+    sets = list("abcd")
+    path = tmp_path / "members.csv"
+    membership_data.to_csv(path, index=False)
+
+    expected, _, _, _ = preprocess_data(membership_data, sets, None, "ascending")
+    for source in [path, FileSource(path, batch_size=100)]:
+        actual, _, _, _ = preprocess_data(source, sets, None, "ascending")
+        pd.testing.assert_frame_equal(actual, expected)
+    assert FileSource(path).columns == list(membership_data.columns)
+    with pytest.raises(ValueError):
+        FileSource(path, batch_size=0)
+
+
+@pytest.fixture
+def sqlite_connection(membership_data):
+    """In-process SQLite database holding the membership table."""
+    import sqlite3
+
+    connection = sqlite3.connect(":memory:")
+    membership_data.to_sql("members", connection, index=False)
+    yield connection
+    connection.close()
+
+
+def test_sql_counts_match_pandas(membership_data, sqlite_connection):
+    """Test that the GROUP BY pushdown reproduces in-memory counts."""
+    from altair_upset import SQLSource
+
+    sets = list("abcd")
+    aggregates = {"score": "mean"}
+    source = SQLSource(sqlite_connection, table="members")
+
+    assert source.columns == list(membership_data.columns)
+    expected = count_intersections(membership_data, sets, aggregates, "batch")
+    actual = count_intersections(source, sets, aggregates, "batch")
+    actual = actual.sort_values(["batch"] + sets, ignore_index=True)
+    pd.testing.assert_frame_equal(
+        actual.drop(columns="score_mean"), expected.drop(columns="score_mean")
+    )
+    np.testing.assert_allclose(actual["score_mean"], expected["score_mean"])
+
+
+def test_sql_query_and_cursor(membership_data, sqlite_connection):
+    """Test queries and bare DB-API cursors as sources."""
+    from altair_upset import SQLSource
+
+    sets = list("abc")
+    source = SQLSource(
+        sqlite_connection.cursor(), query="SELECT a, b, c FROM members WHERE d = 1"
+    )
+    sql = source.group_by_sql(sets)
+    assert sql.count("GROUP BY") == 1
+
+    expected, _, _, _ = preprocess_data(
+        membership_data[membership_data["d"] == 1], sets, None, "ascending"
+    )
+    actual, _, _, _ = preprocess_data(source, sets, None, "ascending")
+    pd.testing.assert_frame_equal(actual, expected)
+
+    chart = UpSetAltair(source, sets, sort_by="degree")
+    assert chart.data["count"].sum() > 0
+
+
+def test_sql_closes_its_cursors(membership_data, sqlite_connection):
+    """Test that cursors opened on a connection are closed after each query."""
+    import sqlite3
+
+    from altair_upset import SQLSource
+
+    class RecordingCursor(sqlite3.Cursor):
+        closed = False
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    class RecordingConnection:
+        def __init__(self, connection):
+            self.connection = connection
+            self.cursors = []
+
+        def cursor(self):
+            self.cursors.append(self.connection.cursor(RecordingCursor))
+            return self.cursors[-1]
+
+    connection = RecordingConnection(sqlite_connection)
+    source = SQLSource(connection, query="SELECT a, b FROM members;\n")
+    assert source.columns == ["a", "b"]
+    actual = count_intersections(source, ["a", "b"])
+    assert actual["count"].sum() == len(membership_data)
+    assert len(connection.cursors) == 2
+    assert all(cursor.closed for cursor in connection.cursors)
+
+
+def test_sql_source_validation(sqlite_connection):
+    """Test that exactly one of table and query is required."""
+    from altair_upset import SQLSource
+
+    with pytest.raises(ValueError):
+        SQLSource(sqlite_connection)
+    with pytest.raises(ValueError):
+        SQLSource(sqlite_connection, table="members", query="SELECT 1")
+    with pytest.raises(ValueError):
+        UpSetAltair(SQLSource(sqlite_connection, table="members"), ["a", "nope"])
@@ -0,0 +1,131 @@
+import pandas as pd
+import pytest
+
+from altair_upset import (
+    IntersectionStore,
+    PartialCounts,
+    UpSetAltair,
+    save_intersections,
+)
+from altair_upset.preprocessing import preprocess_data
+
+pytest.importorskip("pyarrow")
+
+
+pytestmark = pytest.mark.parametrize(
+    "membership_data",
+    [
+        pytest.param(
+            {"rows": 3000, "sets": "abcde", "groups": "xy", "seed": 11}, id="3000x5"
+        )
+    ],
+    indirect=True,
+)
+
+
+@pytest.fixture
+def store_path(membership_data, tmp_path):
+    path = tmp_path / "counts.arrow"
+    save_intersections(
+        membership_data,
+        path,
+        list("abcde"),
+        abbre=list("ABCDE"),
+        aggregates={"score": "mean"},
+        group_by="batch",
+    )
+    return path
+
+
+@pytest.mark.parametrize("mode", ["exclusive", "union"])
+def test_store_matches_raw_data(membership_data, store_path, mode):
+    """Test that charts of the saved counts equal charts of the elements."""
+    store = IntersectionStore(store_path)
+    assert store.sets == list("abcde")
+    assert store.abbre == list("ABCDE")
+    assert len(store) <= 2 * 2**5
+
+    aggregates = {"score": "mean"} if mode == "exclusive" else None
+    for sets, group_by in [(list("abcde"), "batch"), (list("bd"), None)]:
+        args = (sets, None, "ascending", aggregates, mode, "frequency", group_by)
+        expected, _, _, _ = preprocess_data(membership_data, *args)
+        actual, _, _, _ = preprocess_data(store, *args)
+        pd.testing.assert_frame_equal(actual, expected, check_exact=False)
+
+
+def test_store_to_chart(membership_data, store_path):
+    """Test rebuilding a chart from the file alone."""
+    chart = IntersectionStore(store_path).to_chart(title="Cached")
+    expected = UpSetAltair(
+        membership_data,
+        list("abcde"),
+        abbre=list("ABCDE"),
+        aggregates={"score": "mean"},
+        group_by="batch",
+        title="Cached",
+    )
+    pd.testing.assert_frame_equal(chart.data, expected.data, check_exact=False)
+
+    # A subset of the sets keeps the abbreviations of those sets
+    subset = IntersectionStore(store_path).to_chart(sets=["d", "b"])
+    abbreviations = subset.data.groupby("set", observed=True)["set_abbre"].first()
+    assert abbreviations.to_dict() == {"d": "D", "b": "B"}
+
+
+def test_store_validation(membership_data, store_path, tmp_path):
+    """Test errors for data the file does not hold."""
+    store = IntersectionStore(store_path)
+    with pytest.raises(ValueError, match="not counted"):
+        UpSetAltair(store, ["a", "b"], aggregates={"score": "max"})
+    with pytest.raises(ValueError):
+        UpSetAltair(store, ["a", "missing"])
+    with pytest.raises(ValueError):
+        save_intersections(membership_data, tmp_path / "x.arrow", ["a"], abbre=[])
+
+    plain = tmp_path / "plain.arrow"
+    membership_data.to_feather(plain)
+    with pytest.raises(ValueError, match="save_intersections"):
+        IntersectionStore(plain)
+
+
+def test_partial_counts_merge_exactly(membership_data):
+    """Test that merged chunk counts equal counting all rows at once."""
+    sets = list("abcde")
+    options = {"aggregates": {"score": "mean"}, "group_by": "batch"}
+    # Integer scores keep the partial sums exact in any order
+    data = membership_data.assign(score=membership_data["score"].round() * 4)
+    shuffled = data.sample(frac=1, random_state=0)
+    chunks = [shuffled.iloc[i : i + 500] for i in range(0, len(shuffled), 500)]
+    parts = [PartialCounts.from_data(chunk, sets, **options) for chunk in chunks]
+
+    whole = PartialCounts.from_data(data, sets, **options)
+    merged = sum(parts[3:]) + (parts[0] + parts[1]).merge(parts[2])
+    reordered = sum(reversed(parts))
+    assert merged == whole
+    assert reordered == whole
+
+    expected = UpSetAltair(data, sets, **options).data
+    pd.testing.assert_frame_equal(merged.to_chart().data, expected)
+
+
+def test_partial_counts_serialization(membership_data):
+    """Test that counts survive bytes and Arrow round trips."""
+    counts = PartialCounts.from_data(
+        membership_data, list("abc"), abbre=["A", "B", "C"], aggregates={"score": "max"}
+    )
+    payload = counts.to_bytes()
+    assert isinstance(payload, bytes)
+    assert len(payload) < membership_data.memory_usage().sum() / 10
+
+    for restored in [
+        PartialCounts.from_bytes(payload),
+        PartialCounts.from_arrow(counts.to_arrow()),
+    ]:
+        assert restored == counts
+        assert restored.abbre == ["A", "B", "C"]
+        assert restored.aggregates == {"score": "max"}
+
+    with pytest.raises(ValueError, match="same sets"):
+        counts + PartialCounts.from_data(membership_data, list("abd"))
+    with pytest.raises(TypeError):
+        counts + membership_data